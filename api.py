@@ -4,43 +4,42 @@ from inspect import Attribute
 from multiprocessing.sharedctypes import Value
 import os
 import base64
+import hashlib
 import json
 import re
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
-from requests import request
+from typing import Dict, Any, Optional, List, Iterable
 import time
+import threading
+from contextlib import nullcontext
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 
 from pprint import pprint
 from dotenv import load_dotenv
 from authlib.integrations.requests_client import OAuth2Session, OAuth2Auth
 
 from constants import *
-from limiter import LIMITER
-from lookup import UsersLookup, TweetLookup
+from limiter import LIMITER, RateLimiter
+from lookup import UsersLookup, UsernamesLookup, ListsLookup, TweetLookup, CountsLookup
+from models.tweet import Tweet
+from models.counts import TweetCounts
+from transport import create_http_session, share_pool, shares_pool, CONNECTION_ERRORS
+from cache import ResponseCache
+from storage import ResponseStore
+from local_store import LocalStore
+from credentials import CredentialPool, newer_token
+from files import file_lock, write_json
+from retry import RetryPolicy
+from exceptions import TwitterAPIError, ConnectionFailedError, error_for_response
+from calls import (
+    SLEEP, CALL, SEND, advance, CallOptions, call_lookup, paginator, paginate_response, stream_response, columnar_response,
+    fetch, fetch_batches, batch_lookups, merge_batch, single_response, finish_response, report_failure,
+    sync_lookup, merge_sync, count_lookups, search_slices, search_lookups, merge_crawl
+)
 
 load_dotenv()
 
-def paginator(tapi, lookup, max_results, limit, app_only_auth):
-    url = lookup.create_url()
-    next_url = url
-    n_pages = max_results//MAX_RESULTS_PER_PAGE_DEFAULT+1
-    for page in range(n_pages):
-        time.sleep(limit)
-        if page != 0:
-            next_url = lookup.next_page(url, response)
-        if not next_url:
-            break
-
-        response = tapi._get(next_url, app_only_auth)
-        response.raise_for_status()
-        yield response.json()
-        
-            
-def paginate_response(session, lookup, max_results, limit, app_only_auth):    
-    responses = [res for res in paginator(session, lookup, max_results, limit, app_only_auth)]
-    return lookup.paginate_responses(responses)
-
 
 def doublewrap(f):
     def new_dec(*args, **kwargs):
@@ -53,48 +52,91 @@ def doublewrap(f):
 
 
 @doublewrap
-def GET(method, pagination=False, app_only_auth=False):
+def GET(method, pagination=False, app_only_auth=False, batch=None):
+    """
+        Paginated endpoints accept stream=True, which returns a generator
+        yielding User/Tweet objects page by page instead of a list.
+
+        Paginated endpoints fetch up to limit results, max_results unless
+        given, in pages of page_size, by default the largest the endpoint
+        allows that limit needs. The last page is trimmed to limit.
+        stop_when(record), see utils.until_created_at / until_seen_id, ends
+        the crawl at the first result it holds for.
+
+        prefetch=n pipelines paginated calls: the next pages are requested,
+        within the rate budget, while earlier ones are decoded on a worker
+        thread, with at most n pages queued between stages. With
+        columnar=True the pages are appended to a single batch as they come.
+
+        Paginated endpoints also accept checkpoint=True, or a state file
+        path, to persist every page and the last next_token so that the
+        same call resumes where a failed one stopped.
+
+        save=True, the default of the endpoints that declare it so, appends
+        every response page to the client's ResponseStore as it arrives.
+
+        columnar=True returns a UserColumns/TweetColumns batch built from the
+        response json instead of model objects, one batch per page when
+        streaming.
+
+        batch names the query key holding a list of ids or usernames. The
+        lookup is split in URL-length-safe requests that run concurrently,
+        and the merged result keeps the input order. With a LocalStore on the
+        client, ids stored less than max_age seconds ago (per call, or the
+        store's default) are served from it, and every user or tweet fetched
+        is upserted into it.
+
+        Requests are retried according to the RetryPolicy of the client, a
+        request that still fails raises a TwitterAPIError subclass.
+    """
+    save_default = CallOptions.save_default(method)
+
+    @wraps(method)
     def wrapper(self, *args, **kwargs):
         res = None
+        name = method.__name__
+        options = CallOptions.pop(method, save_default, self, args, kwargs)
         try:
-            lookup = method(self, *args, **kwargs)
-            
-            if not pagination:
-                res = self._get(lookup.create_url(), app_only_auth)
-                res.raise_for_status()
-                res = res.json() if res.json().get('data') else {}
-            else:
-                res = paginate_response(
-                    self, 
-                    lookup, 
-                    kwargs.get('max_results'),
-                    15*60//LIMITER[method.__name__]['limit'],
-                    app_only_auth
-                )
-            
-            if kwargs.get('save', False):
-                lookup.save_response(res)
+            lookup = call_lookup(method, pagination, options, self, args, kwargs)
+            route = options.route(pagination, batch)
+            if route == 'columns':
+                return columnar_response(self, name, lookup, app_only_auth, options)
+            if route == 'stream':
+                results = stream_response(self, name, lookup, app_only_auth, options)
+                return results if options.stream else list(results)
 
-            return lookup.datify(res)
+            if route == 'batch':
+                known, lookups = batch_lookups(self, lookup, batch, options.max_age)
+                res = merge_batch(self, lookup, batch, known, fetch_batches(self, name, lookups, app_only_auth))
+            elif route == 'single':
+                res = single_response(self, lookup, fetch(self, name, lookup.create_url(), app_only_auth))
+            else:
+                res = paginate_response(self, name, lookup, app_only_auth, options)
+            return finish_response(self, name, lookup, res, options, pagination)
+        except TwitterAPIError:
+            raise
         except AttributeError as e:
             print(e)
             return res
         except Exception as e:
-            print(f"Failed to get {method.__name__}: {type(e)} {e}")
-            try:
-                print(res.json().get('errors'),'\n')
-            except Exception as e:
-                pass
+            report_failure(name, e, res)
             return res
+    wrapper.lookup = method
+    wrapper.pagination = pagination
+    wrapper.app_only_auth = app_only_auth
+    wrapper.batch = batch
     return wrapper
 
 def POST(method):
+    @wraps(method)
     def wrapper(self, *args, **kwargs):
         res = None
         try:
             url, payload = method(self, *args, **kwargs)
-            res = self._post(url, payload)
+            res = self._post(url, payload, method.__name__)
             res.raise_for_status() 
+        except TwitterAPIError:
+            raise
         except Exception as e:
             try:
                 pprint(res.json())
@@ -102,6 +144,7 @@ def POST(method):
                 pass
             print(f"Failed to post tweet due to {e}")        
         return res
+    wrapper.payload = method
     return wrapper
 
 
@@ -113,21 +156,39 @@ class TwitterAPI:
         client_secret: str,
         manual: Optional[bool] = True,
         bearer_token: Optional[str] = None,
-        scopes: Optional[List[str]] = DEFAULT_SCOPES
+        scopes: Optional[List[str]] = DEFAULT_SCOPES,
+        limiter: Optional[RateLimiter] = None,
+        pool_size: Optional[int] = DEFAULT_POOL_SIZE,
+        keep_alive: Optional[bool] = True,
+        http2: Optional[bool] = False,
+        max_workers: Optional[int] = DEFAULT_MAX_WORKERS,
+        cache: Optional[ResponseCache] = None,
+        retry: Optional[RetryPolicy] = None,
+        storage: Optional[ResponseStore] = None,
+        store: Optional[LocalStore] = None,
+        credentials: Optional[CredentialPool] = None,
     ):
         self.scopes = scopes 
+        self.credentials = credentials
+        self.limiter = limiter or RateLimiter(LIMITER, namespace=client_id or 'default')
+        self.http = create_http_session(pool_size, keep_alive, http2)
+        self.max_workers = max_workers
+        self.cache = cache
+        self.retry = retry or RetryPolicy()
+        self.storage = storage or ResponseStore()
+        self.store = store
         self.client_id = client_id
         self.client_secret = client_secret
         self.session = self.init_session()
         self.bearer_token = bearer_token
         self.manual = manual
+        self._refresh_lock = threading.Lock()
         self.token = self.retrieve_token()
 
         if manual and self._should_auth():
             self.manual_auth_flow()
         
-        if self._should_refresh():
-            self.refresh_token()
+        self.ensure_token()
 
     def init_session(self) -> OAuth2Session:
         session = OAuth2Session(
@@ -137,7 +198,12 @@ class TwitterAPI:
             redirect_uri=DEFAULT_CALLBACK_URI,
             code_challenge_method="S256",
         )
+        share_pool(session, self.http)
         return session
+
+    def close(self) -> None:
+        self.http.close()
+        self.session.close()
     
     def create_authorization_url(self) -> str:
         code_verifier = base64.urlsafe_b64encode(os.urandom(40)).decode("utf-8")
@@ -160,37 +226,80 @@ class TwitterAPI:
         self.save_token()
 
     def refresh_token(self) -> None:
-        try:
-            self.token = self.session.refresh_token(
-                BASE_OAUTH2_ACCESS_TOKEN_URL, 
-                refresh_token=self.token['refresh_token']
-            )
-        except Exception as e:
-            basic_token = base64.b64encode(f'{self.client_id}:{self.client_secret}'.encode('utf-8')).decode('utf-8')
-            res = request(
-                method='POST',
-                url=BASE_OAUTH2_ACCESS_TOKEN_URL,
-                data={
-                    'refresh_token': self.token['refresh_token'],
-                    'grant_type': 'refresh_token',
-                    'client_id': self.client_id
-                },
-                headers={
-                    'Content-Type': 'application/x-www-form-urlencoded',
-                    'Authorization': f'Basic {basic_token}'
-                }
-            )
-            refresh_token = res.json()
-            self.token['access_token'] = refresh_token['access_token']
-            self.token['refresh_token'] = refresh_token['refresh_token']
-            self.token['expires_at'] = int(time.time()) + refresh_token['expires_in']
-        
+        self.token = self._refresh(self.token, self.session)
         self.save_token()
 
+    def _refresh(self, token: dict, session: OAuth2Session) -> dict:
+        """
+            Exchanges the refresh token of token for a new token. Goes
+            through session when it shares the connection pool of self.http,
+            otherwise (an httpx client, http2=True) or when session fails it
+            posts to the token endpoint through self.http itself.
+        """
+        if shares_pool(self.http):
+            try:
+                return session.refresh_token(
+                    BASE_OAUTH2_ACCESS_TOKEN_URL, 
+                    refresh_token=token['refresh_token']
+                )
+            except Exception as e:
+                print(f"Failed to refresh token through the OAuth2 session, posting it instead: {type(e)} {e}")
+        basic_token = base64.b64encode(f'{self.client_id}:{self.client_secret}'.encode('utf-8')).decode('utf-8')
+        res = self.http.request(
+            method='POST',
+            url=BASE_OAUTH2_ACCESS_TOKEN_URL,
+            data={
+                'refresh_token': token['refresh_token'],
+                'grant_type': 'refresh_token',
+                'client_id': self.client_id
+            },
+            headers={
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Authorization': f'Basic {basic_token}'
+            }
+        )
+        res.raise_for_status()
+        refresh_token = res.json()
+        return {
+            **token,
+            'access_token': refresh_token['access_token'],
+            'refresh_token': refresh_token['refresh_token'],
+            'expires_at': int(time.time()) + refresh_token['expires_in'],
+        }
+
+    def ensure_token(self, rejected: Optional[str] = None) -> None:
+        """
+            Single flight refresh. Threads of this client, and processes
+            sharing the token file, refresh one at a time; the ones that
+            waited pick up the token saved by the first instead of
+            refreshing again, which would invalidate its refresh token.
+            rejected is an access token the api answered 401 to, it is
+            refreshed even before it expires unless it was replaced already.
+        """
+        if not self._needs_refresh(rejected):
+            return
+        with self._refresh_lock, file_lock(DEFAULT_TOKEN_PATH):
+            self.reload_token()
+            if self._needs_refresh(rejected):
+                self.refresh_token()
+
+    def _needs_refresh(self, rejected: Optional[str] = None) -> bool:
+        if not self.token:
+            return False
+        return bool(self._should_refresh()) or (rejected is not None and self.token.get('access_token') == rejected)
+
+    def reload_token(self) -> bool:
+        """ Adopts the saved token if another client refreshed it since, True if it did. """
+        saved = self.retrieve_token()
+        if not newer_token(saved, self.token):
+            return False
+        self.token = saved
+        return True
+
     def retrieve_token(self):
         try:
-            if 'twitter.token' in os.listdir('data/saved_tokens'):
-                with open('data/saved_tokens/twitter.token', 'r') as file:
+            if os.path.exists(DEFAULT_TOKEN_PATH):
+                with open(DEFAULT_TOKEN_PATH, 'r') as file:
                     return json.load(file)
             else:
                 return None
@@ -199,16 +308,16 @@ class TwitterAPI:
 
 
     def save_token(self):
+        """ Writes the token to a temporary file renamed over the saved one, readers never see it half written. """
         try:
             if self.token:
-                with open('data/saved_tokens/twitter.token', 'w') as file:
-                    json.dump(self.token, file)
+                write_json(DEFAULT_TOKEN_PATH, self.token)
         except Exception as e:
             print(f"Failed to save token: {e}")
 
     def _should_refresh(self):
         if self.token:
-            if int(time.time()) - REFRESH_MARGIN > self.token['expires_at']:
+            if int(time.time()) + REFRESH_MARGIN > self.token['expires_at']:
                 return True
             return False
     
@@ -227,50 +336,144 @@ class TwitterAPI:
             resp_url = input("Paste the response from the above link: \n")
             self.fetch_token(resp_url)
 
-    def _get(self, url, app_only_auth):
-        if self._should_refresh():
-            self.refresh_token()
-        token = self.token['access_token'] if not app_only_auth else self.bearer_token
-        if token:
-            return request(
-                method="GET",
-                url=url,
-                headers={
-                    'Authorization': f"Bearer {token}"
-                }
-            )
-        raise ValueError("No Bearer Token found.")
+    def refresh_credential(self, credential, rejected: Optional[str] = None) -> None:
+        """
+            Single flight refresh of a pooled user token, through its own
+            OAuth2Session so the client's token is left alone. Credentials
+            saved to a file are locked and reloaded first, like ensure_token.
+        """
+        with self._refresh_lock, (file_lock(credential.path) if credential.path else nullcontext()):
+            credential.reload()
+            if credential.should_refresh() or credential.access_token == rejected:
+                session = self.init_session()
+                try:
+                    token = self._refresh(credential.token, session)
+                finally:
+                    session.close()
+                credential.refreshed(dict(token))
+
+    def _cache_scope(self, app_only_auth):
+        """
+            Cache scope of a request, None when it must not be cached. App
+            only responses are shared, user context ones are scoped to the
+            token. Requests routed through a CredentialPool are answered by
+            whichever credential has budget, so only their app only
+            responses are cached.
+        """
+        if self.cache is None:
+            return None
+        if app_only_auth:
+            return ''
+        if self.credentials is not None and self.credentials.usable(False):
+            return None
+        if not self.token:
+            return None
+        return hashlib.sha256(self.token['access_token'].encode('utf-8')).hexdigest()[:16]
+
+    def _checkout(self, endpoint, app_only_auth):
+        """ (credential, limiter, wait) for the next request, credential is None without a pool. """
+        if self.credentials is not None:
+            credential, wait = self.credentials.checkout(endpoint, app_only_auth)
+            if credential is not None:
+                return credential, credential.limiter, wait
+        wait = self.limiter.reserve(endpoint) if endpoint else 0.0
+        return None, self.limiter, wait
+
+    def _request_steps(self, method, url, app_only_auth, endpoint, idempotent, payload):
+        """
+            The decisions of a request: credential, token refresh, retries
+            and failover. _request and _arequest only run its steps,
+            (SLEEP, seconds), (CALL, (function, *args)) for the blocking
+            refreshes and (SEND, headers), answered with the response or the
+            connection error sending it raised. Returns the response.
+        """
+        attempt = 0
+        refreshed = False
+        while True:
+            credential, limiter, wait = self._checkout(endpoint, app_only_auth)
+            if wait > 0:
+                yield SLEEP, wait
+            if credential is None:
+                if self._needs_refresh():
+                    yield CALL, (self.ensure_token,)
+                token = self.token['access_token'] if not app_only_auth else self.bearer_token
+            else:
+                if credential.should_refresh():
+                    yield CALL, (self.refresh_credential, credential)
+                token = credential.access_token
+            if not token:
+                raise ValueError("No Bearer Token found.")
+            headers = {'Authorization': f"Bearer {token}"}
+            if payload is not None:
+                headers['Content-type'] = 'application/json'
+
+            res = yield SEND, headers
+            if isinstance(res, Exception):
+                if not idempotent or attempt >= self.retry.max_retries:
+                    raise ConnectionFailedError(f"{method} {url} failed: {res}") from res
+                yield SLEEP, self.retry.backoff(attempt)
+                attempt += 1
+                continue
+            if endpoint:
+                limiter.update(endpoint, res.headers)
+
+            if res.status_code < 400:
+                return res
+            if res.status_code == 401 and not app_only_auth and not refreshed:
+                refreshed = True
+                if credential is None:
+                    yield CALL, (self.ensure_token, token)
+                else:
+                    yield CALL, (self.refresh_credential, credential, token)
+                continue
+            if credential is not None and self.credentials.failover(credential, endpoint, res):
+                continue
+            delay = self.retry.delay(res, attempt, idempotent)
+            if delay is None:
+                raise error_for_response(res, attempt + 1)
+            yield SLEEP, delay
+            attempt += 1
+
+    def _request(self, method, url, app_only_auth=False, endpoint=None, idempotent=True, payload=None):
+        steps = self._request_steps(method, url, app_only_auth, endpoint, idempotent, payload)
+        outcome = None
+        while True:
+            step, value = advance(steps, outcome)
+            if step is None:
+                return value
+            outcome = None
+            if step == SLEEP:
+                time.sleep(value)
+            elif step == CALL:
+                value[0](*value[1:])
+            else:
+                try:
+                    outcome = self.http.request(method=method, url=url, json=payload, headers=value)
+                except CONNECTION_ERRORS as e:
+                    outcome = e
+
+    def _get(self, url, app_only_auth, endpoint=None):
+        return self._request('GET', url, app_only_auth, endpoint)
     
-    def _post(self, url, payload):
-        if self._should_refresh():
-            self.refresh_token()
-        return request(
-            method='POST',
-            url=url,
-            json=payload,
-            headers={
-                'Authorization': f'Bearer {self.token["access_token"]}',
-                'Content-type': 'application/json'
-            }
-        )
+    def _post(self, url, payload, endpoint=None):
+        return self._request('POST', url, endpoint=endpoint, idempotent=False, payload=payload)
 
-    @GET
+    @GET(batch='ids')
     def get_users(
         self, 
-        users_ids: List[str],  
+        users_ids: Iterable[str],  
         expansions: Optional[List[str]]= DEFAULT_USERS_LOOKUP_EXPANSION, 
         user_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_USER_FIELDS, 
         tweet_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_TWEET_FIELDS,
         save: Optional[bool] = False
     ):
         """
+            users_ids: any number of ids, fetched in batches of at most 100
+
             expansions: ['pinned_tweet_id']
         """
-        if len(users_ids) > MAX_USERS_ID:
-            raise AttributeError("User ids must not exceed 100")
-
         endpoint = USERS_LOOKUP_BY_ID_ENDPOINT
-        query = {'ids': users_ids}
+        query = {'ids': list(users_ids)}
         users_lookup = UsersLookup(
             endpoint=endpoint,
             query=query,
@@ -280,21 +483,27 @@ class TwitterAPI:
         )
         return users_lookup
         
-    @GET
+    @GET(batch='usernames')
     def get_users_by_usernames(
         self, 
-        usernames: List[str], 
+        usernames: Iterable[str], 
         expansions: Optional[List[str]]= DEFAULT_USERS_LOOKUP_EXPANSION, 
         user_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_USER_FIELDS, 
         tweet_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_TWEET_FIELDS,
         save: Optional[bool] = False,
     ):
         """
+            usernames: any number of usernames, packed in as few requests as
+                the 100 items and url length limits allow
+
+            returns (users, unknown) where unknown are the usernames that
+            did not resolve to a user
+
             expansions: ['pinned_tweet_id'] 
         """
         endpoint = USERS_LOOKUP_BY_USERNAME_ENDPOINT
-        query = {'usernames': usernames}
-        users_lookup = UsersLookup(
+        query = {'usernames': list(usernames)}
+        users_lookup = UsernamesLookup(
             endpoint=endpoint,
             query=query,
             expansions=expansions,
@@ -358,14 +567,14 @@ class TwitterAPI:
         max_results = max_results if max_results < MAX_RESULTS_PER_PAGE_DEFAULT else MAX_RESULTS_PER_PAGE_DEFAULT
         endpoint = USERS_LOOKUP_FOLLOWED_LISTS_BY_ID_ENDPOINT
         query = {'max_results': [str(max_results)]}
-        users_lookup = UsersLookup(
+        lists_lookup = ListsLookup(
             endpoint=endpoint.replace('<id>', user_id),
             query=query,
             expansions=expansions,
             user_fields=user_fields,
             list_fields=list_fields
         )
-        return users_lookup
+        return lists_lookup
 
     @GET(pagination=True)
     def get_user_list_membership(
@@ -382,14 +591,14 @@ class TwitterAPI:
         max_results = max_results if max_results < MAX_RESULTS_PER_PAGE_DEFAULT else MAX_RESULTS_PER_PAGE_DEFAULT
         endpoint = USERS_LOOKUP_LIST_MEMBERSHIPS_BY_ID_ENDPOINT
         query = {'max_results': [str(max_results)]}
-        users_lookup = UsersLookup(
+        lists_lookup = ListsLookup(
             endpoint=endpoint.replace('<id>', user_id),
             query=query,
             expansions=expansions,
             user_fields=user_fields,
             list_fields=list_fields
         )
-        return users_lookup
+        return lists_lookup
 
     @GET(pagination=True)
     def get_users_owned_lists(
@@ -406,14 +615,14 @@ class TwitterAPI:
         max_results = max_results if max_results < MAX_RESULTS_PER_PAGE_DEFAULT else MAX_RESULTS_PER_PAGE_DEFAULT
         endpoint = USERS_LOOKUP_OWNED_LISTS_BY_ID_ENDPOINT
         query = {'max_results': [str(max_results)]}
-        users_lookup = UsersLookup(
+        lists_lookup = ListsLookup(
             endpoint=endpoint.replace('<id>', user_id),
             query=query,
             expansions=expansions,
             user_fields=user_fields,
             list_fields=list_fields
         )
-        return users_lookup
+        return lists_lookup
 
     @GET
     def get_users_pinned_lists(
@@ -427,13 +636,13 @@ class TwitterAPI:
             expansions: ['owner_id']
         """
         endpoint = USERS_LOOKUP_PINNED_LISTS_BY_ID_ENDPOINT
-        users_lookup = UsersLookup(
+        lists_lookup = ListsLookup(
             endpoint=endpoint.replace('<id>', user_id),
             expansions=expansions,
             user_fields=user_fields,
             list_fields=list_fields
         )
-        return users_lookup
+        return lists_lookup
 
     @GET(pagination=True)
     def get_user_followers(
@@ -604,7 +813,7 @@ class TwitterAPI:
         self,
         user_id: str,
         max_results: Optional[int] = MAX_RESULTS_PER_PAGE_DEFAULT,
-        query: Optional[Dict[str, str]] = {}, 
+        query: Optional[Dict[str, str]] = None,
         expansions: Optional[List[str]]= DEFAULT_USERS_LOOKUP_EXPANSION,
         tweet_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_TWEET_FIELDS,
         media_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_MEDIA_FIELDS,
@@ -633,6 +842,7 @@ class TwitterAPI:
         """
         max_results = max_results if 5 <= max_results <= MAX_RESULTS_PER_PAGE_DEFAULT else MAX_RESULTS_PER_PAGE_DEFAULT
         endpoint = USERS_LOOKUP_MENTIONS_BY_ID_ENDPOINT
+        query = dict(query or {})
         query['max_results'] = [str(max_results)]
         tweets_lookup = TweetLookup(
             endpoint=endpoint.replace('<id>', user_id),
@@ -651,7 +861,7 @@ class TwitterAPI:
         self,
         user_id: str,
         max_results: Optional[int] = MAX_RESULTS_PER_PAGE_DEFAULT,
-        query: Dict[str, Any] = {},
+        query: Optional[Dict[str, Any]] = None,
         expansions: Optional[List[str]]= DEFAULT_USERS_LOOKUP_EXPANSION,
         tweet_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_TWEET_FIELDS,
         media_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_MEDIA_FIELDS,
@@ -680,6 +890,7 @@ class TwitterAPI:
         """
         max_results = max_results if max_results < MAX_RESULTS_PER_PAGE_DEFAULT else MAX_RESULTS_PER_PAGE_DEFAULT
         endpoint = USERS_LOOKUP_TIMELINES_REVERSE_CHRONOLOGICAL_BY_ID_ENDPOINT
+        query = dict(query or {})
         query['max_results'] = [str(max_results)]
         tweets_lookup = TweetLookup(
             endpoint=endpoint.replace('<id>', user_id),
@@ -693,6 +904,25 @@ class TwitterAPI:
         )
         return tweets_lookup
 
+    def _sync(self, endpoint, user_id, limit, kwargs) -> List[Tweet]:
+        key, lookup = sync_lookup(self, endpoint, user_id, kwargs)
+        responses = list(paginator(self, endpoint.__name__, lookup, limit, False))
+        return merge_sync(self, key, lookup, responses)
+
+    def sync_user_mentions(self, user_id: str, limit: int = DEFAULT_SYNC_LIMIT, **kwargs) -> List[Tweet]:
+        """
+            Mentions of user_id newer than the last sync, newest first, at
+            most limit per call. When more are pending, the next calls return
+            the older ones until the backlog is in. Needs a LocalStore, which
+            keeps the tweets, the per user since_id and the resume cursor.
+            kwargs are passed to get_user_mentions.
+        """
+        return self._sync(TwitterAPI.get_user_mentions, user_id, limit, kwargs)
+
+    def sync_user_timeline(self, user_id: str, limit: int = DEFAULT_SYNC_LIMIT, **kwargs) -> List[Tweet]:
+        """ Same as sync_user_mentions for get_user_timelines_reverse_chronological. """
+        return self._sync(TwitterAPI.get_user_timelines_reverse_chronological, user_id, limit, kwargs)
+
     @GET
     def get_me(
         self,
@@ -788,10 +1018,10 @@ class TwitterAPI:
         )
         return users_lookup
     
-    @GET
+    @GET(batch='ids')
     def get_tweets(
         self,
-        tweet_ids: list,
+        tweet_ids: Iterable[str],
         expansions: Optional[List[str]]= DEFAULT_USERS_LOOKUP_EXPANSION,
         user_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_USER_FIELDS,
         tweet_fields: Optional[List[str]]= DEFAULT_USERS_LOOKUP_TWEET_FIELDS,
@@ -801,6 +1031,8 @@ class TwitterAPI:
         save: Optional[bool] = True,
     ):
         """
+            tweet_ids: any number of ids, fetched in batches of at most 100
+
             expansions: [
                 'attachments.media_keys',
                 'attachments.poll_ids',
@@ -813,7 +1045,7 @@ class TwitterAPI:
             ]
         """
         endpoint = TWEETS_LOOKUP_BY_USERS_ENDPOINT
-        query = {'ids': tweet_ids}
+        query = {'ids': list(tweet_ids)}
         tweet_lookup = TweetLookup(
             endpoint=endpoint,
             query=query,
@@ -997,7 +1229,7 @@ class TwitterAPI:
         return tweet_lookup
 
 
-    @GET(pagination=True, app_only_auth=True)
+    @GET(app_only_auth=True)
     def tweet_recent_count(
         self,
         start_time: datetime = None,
@@ -1008,9 +1240,12 @@ class TwitterAPI:
         qquery: str = None,
         count_fields = DEFAULT_TWEETS_LOOKUP_COUNT,
     ):
-
+        """
+            Returns a TweetCounts series (models.counts) with the bucket
+            start times, the tweets per bucket and meta.total_tweet_count.
+        """
         endpoint = TWEETS_LOOKUP_RECENT_COUNT_ENDPOINT
-        query = {'max_results': [MAX_RESULTS_PER_PAGE_DEFAULT]}
+        query = {}
         if qquery:
             query['query'] = qquery
         if start_time:
@@ -1024,12 +1259,61 @@ class TwitterAPI:
         if granularity in ["minute", 'hour', 'day']:
             query['granularity'] = granularity
 
-        tweet_lookup = TweetLookup(
+        counts_lookup = CountsLookup(
             endpoint=endpoint,
             query=query,
             count_fields=count_fields,
         )
-        return tweet_lookup
+        return counts_lookup
+
+    def tweet_recent_counts(
+        self,
+        qqueries: Iterable[str],
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        granularity: str = 'day',
+    ) -> Dict[str, TweetCounts]:
+        """
+            tweet_recent_count of several queries fetched concurrently,
+            {qquery: TweetCounts}. models.counts.stack aligns them in a matrix.
+        """
+        qqueries = list(qqueries)
+        lookups = count_lookups(self, TwitterAPI.tweet_recent_count, qqueries, start_time, end_time, granularity)
+        responses = fetch_batches(self, 'tweet_recent_count', lookups, True)
+        return {
+            qquery: lookup.datify(response) 
+            for qquery, lookup, response in zip(qqueries, lookups, responses)
+        }
+
+    def crawl_recent_search(
+        self,
+        qquery: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        slices: Optional[int] = None,
+        granularity: str = 'hour',
+        save: bool = False,
+        **kwargs
+    ) -> List[Tweet]:
+        """
+            tweet_recent_search over start_time/end_time split in time slices
+            of about the same volume, sized with tweet_recent_count at the
+            given granularity. Slices (max_workers by default) are crawled
+            concurrently and share the tweet_recent_search rate limit of the
+            client. The counts only balance the slices, every slice is
+            paginated to its end. Returns the tweets deduplicated by id,
+            newest first. kwargs are passed to tweet_recent_search.
+        """
+        windows = search_slices(
+            self, TwitterAPI.tweet_recent_count, qquery, start_time, end_time, slices or self.max_workers, granularity
+        )
+        lookups = search_lookups(self, TwitterAPI.tweet_recent_search, qquery, windows, kwargs)
+
+        def crawl(lookup):
+            return list(paginator(self, 'tweet_recent_search', lookup, None, True, save=save))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return merge_crawl(lookups, list(executor.map(crawl, lookups)))
 
     @POST
     def post_tweet(
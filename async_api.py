@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+import asyncio
+from functools import wraps
+from typing import Dict, Iterable, Optional, List
+
+from constants import *
+from api import TwitterAPI
+from calls import (
+    Pager, CallOptions, SLEEP, CALL, advance, sync_lookup, merge_sync, volume_slices,
+    count_lookups, search_lookups, merge_crawl, call_lookup, batch_lookups, merge_batch,
+    single_response, finish_response, report_failure, page_decoder, column_sink, cached, cache_response
+)
+from models.tweet import Tweet
+from models.counts import TweetCounts
+from limiter import RateLimiter
+from cache import ResponseCache
+from storage import ResponseStore
+from local_store import LocalStore
+from pipeline import async_pipelined
+from credentials import CredentialPool
+from retry import RetryPolicy
+from exceptions import TwitterAPIError
+from transport import create_async_http_session, CONNECTION_ERRORS
+
+
+async def async_paginator(tapi, name, lookup, limit, app_only_auth, checkpoint=None, save=False, stop_when=None):
+    """ Coroutine counterpart of calls.paginator. """
+    pager = Pager(tapi, name, lookup, limit, checkpoint, save, stop_when)
+    for page in pager.replayed():
+        yield page
+    url = pager.request_url()
+    while url:
+        yield pager.turn(await tapi._aget(url, app_only_auth, name))
+        url = pager.request_url()
+    pager.finish()
+
+
+async def async_paginate_response(tapi, name, lookup, app_only_auth, options):
+    pages = async_paginator(tapi, name, lookup, options.limit, app_only_auth, options.checkpoint, options.save, options.stop_when)
+    return lookup.paginate_responses([page async for page in pages])
+
+
+async def async_stream_response(tapi, name, lookup, app_only_auth, options):
+    decode = page_decoder(lookup, options.columnar)
+    results = async_paginator(tapi, name, lookup, options.limit, app_only_auth, options.checkpoint, options.save, options.stop_when)
+    try:
+        if options.prefetch:
+            results = async_pipelined(results, decode, options.prefetch)
+        async for data in results:
+            if not options.prefetch:
+                data = decode(data)
+            if options.columnar:
+                yield data
+                continue
+            for obj in data or []:
+                yield obj
+    except TwitterAPIError:
+        raise
+    except Exception as e:
+        print(f"Failed to stream {name}: {type(e)} {e}")
+
+
+async def async_columnar_response(tapi, name, lookup, app_only_auth, options):
+    columns, append = column_sink(lookup)
+    results = async_paginator(tapi, name, lookup, options.limit, app_only_auth, options.checkpoint, options.save, options.stop_when)
+    async for _ in async_pipelined(results, append, options.prefetch):
+        pass
+    return columns
+
+
+async def async_fetch(tapi, name, url, app_only_auth):
+    scope, res = cached(tapi, name, url, app_only_auth)
+    if res is not None:
+        return res
+    return cache_response(tapi, name, url, scope, await tapi._aget(url, app_only_auth, name))
+
+
+async def async_fetch_batches(tapi, name, lookups, app_only_auth):
+    """ Fetches the batches concurrently, at most max_workers in flight like the sync client. """
+    slots = asyncio.Semaphore(tapi.max_workers)
+
+    async def fetch_batch(lookup):
+        async with slots:
+            return await async_fetch(tapi, name, lookup.create_url(), app_only_auth)
+
+    return list(await asyncio.gather(*(fetch_batch(lookup) for lookup in lookups)))
+
+
+def AGET(method, pagination=False, app_only_auth=False, batch=None):
+    """
+        Coroutine counterpart of api.GET. method is the undecorated Lookup
+        builder of a TwitterAPI endpoint.
+    """
+    save_default = CallOptions.save_default(method)
+
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        res = None
+        name = method.__name__
+        options = CallOptions.pop(method, save_default, self, args, kwargs)
+        try:
+            lookup = call_lookup(method, pagination, options, self, args, kwargs)
+            route = options.route(pagination, batch)
+            if route == 'columns':
+                return await async_columnar_response(self, name, lookup, app_only_auth, options)
+            if route == 'stream':
+                results = async_stream_response(self, name, lookup, app_only_auth, options)
+                return results if options.stream else [obj async for obj in results]
+
+            if route == 'batch':
+                known, lookups = batch_lookups(self, lookup, batch, options.max_age)
+                res = merge_batch(self, lookup, batch, known, await async_fetch_batches(self, name, lookups, app_only_auth))
+            elif route == 'single':
+                res = single_response(self, lookup, await async_fetch(self, name, lookup.create_url(), app_only_auth))
+            else:
+                res = await async_paginate_response(self, name, lookup, app_only_auth, options)
+            return finish_response(self, name, lookup, res, options, pagination)
+        except TwitterAPIError:
+            raise
+        except AttributeError as e:
+            print(e)
+            return res
+        except Exception as e:
+            report_failure(name, e, res)
+            return res
+    return wrapper
+
+
+def APOST(method):
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        res = None
+        try:
+            url, payload = method(self, *args, **kwargs)
+            res = await self._apost(url, payload, method.__name__)
+            res.raise_for_status()
+        except TwitterAPIError:
+            raise
+        except Exception as e:
+            try:
+                print(res.json())
+            except:
+                pass
+            print(f"Failed to post tweet due to {e}")
+        return res
+    return wrapper
+
+
+class AsyncTwitterAPI(TwitterAPI):
+    """
+        Same endpoints as TwitterAPI, but every endpoint is a coroutine backed
+        by an httpx.AsyncClient. Rate limit buckets are shared by all the
+        coroutines of an instance, pass the same limiter to share them with
+        other clients too. Limiter transactions run on worker threads, a
+        budget locked by another process never blocks the event loop.
+
+            async with AsyncTwitterAPI(...) as twitter:
+                users, tweets = await asyncio.gather(
+                    twitter.get_users(ids),
+                    twitter.get_tweets(tweet_ids),
+                )
+    """
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        manual: Optional[bool] = True,
+        bearer_token: Optional[str] = None,
+        scopes: Optional[List[str]] = DEFAULT_SCOPES,
+        limiter: Optional[RateLimiter] = None,
+        pool_size: Optional[int] = DEFAULT_POOL_SIZE,
+        keep_alive: Optional[bool] = True,
+        http2: Optional[bool] = False,
+        max_workers: Optional[int] = DEFAULT_MAX_WORKERS,
+        cache: Optional[ResponseCache] = None,
+        retry: Optional[RetryPolicy] = None,
+        storage: Optional[ResponseStore] = None,
+        store: Optional[LocalStore] = None,
+        credentials: Optional[CredentialPool] = None,
+    ):
+        super().__init__(
+            client_id,
+            client_secret,
+            manual=manual,
+            bearer_token=bearer_token,
+            scopes=scopes,
+            limiter=limiter,
+            pool_size=pool_size,
+            keep_alive=keep_alive,
+            http2=http2,
+            max_workers=max_workers,
+            cache=cache,
+            retry=retry,
+            storage=storage,
+            store=store,
+            credentials=credentials,
+        )
+        self.ahttp = create_async_http_session(pool_size, keep_alive, http2)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.ahttp.aclose()
+        self.close()
+
+    async def _arequest(self, method, url, app_only_auth=False, endpoint=None, idempotent=True, payload=None):
+        steps = self._request_steps(method, url, app_only_auth, endpoint, idempotent, payload)
+        outcome = None
+        while True:
+            # the steps reserve and update the rate limit budgets, a file or
+            # redis transaction that may wait on other processes
+            step, value = await asyncio.to_thread(advance, steps, outcome)
+            if step is None:
+                return value
+            outcome = None
+            if step == SLEEP:
+                await asyncio.sleep(value)
+            elif step == CALL:
+                await asyncio.to_thread(*value)
+            else:
+                try:
+                    outcome = await self.ahttp.request(method=method, url=url, json=payload, headers=value)
+                except CONNECTION_ERRORS as e:
+                    outcome = e
+
+    async def _aget(self, url, app_only_auth, endpoint=None):
+        return await self._arequest('GET', url, app_only_auth, endpoint)
+
+    async def _apost(self, url, payload, endpoint=None):
+        return await self._arequest('POST', url, endpoint=endpoint, idempotent=False, payload=payload)
+
+    async def _sync(self, endpoint, user_id, limit, kwargs) -> List[Tweet]:
+        key, lookup = sync_lookup(self, endpoint, user_id, kwargs)
+        name = endpoint.__name__
+        responses = [page async for page in async_paginator(self, name, lookup, limit, False)]
+        return merge_sync(self, key, lookup, responses)
+
+    async def sync_user_mentions(self, user_id: str, limit: int = DEFAULT_SYNC_LIMIT, **kwargs) -> List[Tweet]:
+        return await self._sync(TwitterAPI.get_user_mentions, user_id, limit, kwargs)
+
+    async def sync_user_timeline(self, user_id: str, limit: int = DEFAULT_SYNC_LIMIT, **kwargs) -> List[Tweet]:
+        return await self._sync(TwitterAPI.get_user_timelines_reverse_chronological, user_id, limit, kwargs)
+
+    async def crawl_recent_search(
+        self,
+        qquery: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        slices: Optional[int] = None,
+        granularity: str = 'hour',
+        save: bool = False,
+        **kwargs
+    ) -> List[Tweet]:
+        lookup, = count_lookups(self, TwitterAPI.tweet_recent_count, [qquery], start_time, end_time, granularity)
+        counts = await async_fetch(self, 'tweet_recent_count', lookup.create_url(), True)
+        windows = volume_slices(counts.get('data', []), slices or self.max_workers, start_time, end_time)
+        lookups = search_lookups(self, TwitterAPI.tweet_recent_search, qquery, windows, kwargs)
+
+        async def crawl(lookup):
+            return [page async for page in async_paginator(self, 'tweet_recent_search', lookup, None, True, save=save)]
+
+        return merge_crawl(lookups, await asyncio.gather(*(crawl(lookup) for lookup in lookups)))
+
+    async def tweet_recent_counts(
+        self,
+        qqueries: Iterable[str],
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        granularity: str = 'day',
+    ) -> Dict[str, TweetCounts]:
+        qqueries = list(qqueries)
+        lookups = count_lookups(self, TwitterAPI.tweet_recent_count, qqueries, start_time, end_time, granularity)
+        responses = await async_fetch_batches(self, 'tweet_recent_count', lookups, True)
+        return {
+            qquery: lookup.datify(response)
+            for qquery, lookup, response in zip(qqueries, lookups, responses)
+        }
+
+for _name, _endpoint in vars(TwitterAPI).items():
+    if hasattr(_endpoint, 'lookup'):
+        setattr(
+            AsyncTwitterAPI, 
+            _name, 
+            AGET(
+                _endpoint.lookup, 
+                _endpoint.pagination, 
+                _endpoint.app_only_auth, 
+                _endpoint.batch
+            )
+        )
+    elif hasattr(_endpoint, 'payload'):
+        setattr(AsyncTwitterAPI, _name, APOST(_endpoint.payload))
@@ -0,0 +1,73 @@
+"""
+    Parity and speed of models.decoders against dataclass_wizard from_dict.
+
+        python -m benchmarks.decode
+"""
+import timeit
+
+from constants import ALL_USER_FIELDS, ALL_TWEET_FIELDS, DEFAULT_USERS_LOOKUP_USER_FIELDS
+from models.user import User
+from models.tweet import Tweet
+from models.decoders import decode_users, decode_tweets, expanded_fields
+from benchmarks import samples
+
+USER_EXPANSIONS = ['pinned_tweet_id']
+SUBSET_TWEET_FIELDS = ['created_at', 'lang']
+TWEET_EXPANSIONS = ['author_id', 'referenced_tweets.id', 'entities.mentions.username']
+
+
+def check_parity(data, decode, model):
+    fast = decode(data)
+    slow = [model.from_dict(d) for d in data]
+    assert fast == slow, f"{model.__name__} decoders disagree"
+
+
+def returned(data, fields, expansions=()):
+    """ The records as the api returns them for fields and expansions, only those keys. """
+    keys = set(fields) | expanded_fields(expansions) | {'id', 'name', 'username', 'text'}
+    return [{k: v for k, v in d.items() if k in keys} for d in data]
+
+
+def bench(label, fn, number=30):
+    seconds = min(timeit.repeat(fn, number=number, repeat=7)) / number
+    print(f"{label:<42} {seconds*1000:8.2f} ms/page")
+    return seconds
+
+
+if __name__ == '__main__':
+    users = samples.users(1000)
+    tweets = samples.tweets(1000)
+
+    check_parity(users, lambda data: decode_users(data, ALL_USER_FIELDS), User)
+    check_parity(tweets, lambda data: decode_tweets(data, ALL_TWEET_FIELDS), Tweet)
+    default_users = returned(users, DEFAULT_USERS_LOOKUP_USER_FIELDS, USER_EXPANSIONS)
+    check_parity(
+        default_users, 
+        lambda data: decode_users(data, DEFAULT_USERS_LOOKUP_USER_FIELDS, USER_EXPANSIONS), 
+        User
+    )
+    subset_tweets = returned(tweets, SUBSET_TWEET_FIELDS, TWEET_EXPANSIONS)
+    check_parity(
+        subset_tweets, 
+        lambda data: decode_tweets(data, SUBSET_TWEET_FIELDS, TWEET_EXPANSIONS), 
+        Tweet
+    )
+    print("parity: ok (1000 users, 1000 tweets, full and requested fields with expansions)\n")
+
+    slow = bench("User.from_dict x1000", lambda: [User.from_dict(d) for d in users])
+    fast = bench("decode_users x1000", lambda: decode_users(users, ALL_USER_FIELDS))
+    print(f"speedup: {slow/fast:.1f}x\n")
+
+    slow = bench(
+        "User.from_dict x1000 (default user_fields)", 
+        lambda: [User.from_dict(d) for d in default_users]
+    )
+    fast = bench(
+        "decode_users x1000 (default user_fields)", 
+        lambda: decode_users(default_users, DEFAULT_USERS_LOOKUP_USER_FIELDS, USER_EXPANSIONS)
+    )
+    print(f"speedup: {slow/fast:.1f}x\n")
+
+    slow = bench("Tweet.from_dict x1000", lambda: [Tweet.from_dict(d) for d in tweets])
+    fast = bench("decode_tweets x1000", lambda: decode_tweets(tweets, ALL_TWEET_FIELDS))
+    print(f"speedup: {slow/fast:.1f}x")
@@ -0,0 +1,35 @@
+"""
+    Cost of parsing a 1000 users page with each installed json backend, and
+    of the old paginator, which parsed every page twice (page and next_token).
+
+        python -m benchmarks.json_decode
+"""
+import json
+import timeit
+
+import json_backend
+from json_backend import BACKENDS
+from benchmarks import samples
+
+
+def bench(label, fn, number=50):
+    seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+    print(f"{label:<42} {seconds*1000:8.2f} ms/page")
+    return seconds
+
+
+if __name__ == '__main__':
+    body = json.dumps(samples.users_page(1000)).encode('utf-8')
+    print(f"page: 1000 users, {len(body)/1024:.0f} KiB\n")
+
+    stdlib = bench("json.loads x2 (before)", lambda: [json.loads(body) for _ in range(2)])
+    for name in BACKENDS:
+        try:
+            json_backend.set_backend(name)
+        except ImportError:
+            print(f"{name:<42} not installed")
+            continue
+        assert json_backend.loads(body) == json.loads(body)
+        seconds = bench(f"{name} loads x1", lambda: json_backend.loads(body))
+        print(f"{'':<42} {stdlib/seconds:8.1f}x")
+    json_backend.set_backend()
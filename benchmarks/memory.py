@@ -0,0 +1,39 @@
+"""
+    Memory held by 100k decoded users/tweets, strings included.
+
+        python -m benchmarks.memory
+"""
+import gc
+import json
+import tracemalloc
+
+from constants import ALL_USER_FIELDS, ALL_TWEET_FIELDS
+from models.decoders import decode_users, decode_tweets
+from models.columns import UserColumns, TweetColumns
+from benchmarks import samples
+
+N = 100_000
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, current / 2**20
+
+
+if __name__ == '__main__':
+    users = json.dumps(samples.users(N))
+    tweets = json.dumps(samples.tweets(N))
+
+    for label, build in [
+        ('User objects', lambda: decode_users(json.loads(users), ALL_USER_FIELDS)),
+        ('UserColumns', lambda: UserColumns.from_records(json.loads(users))),
+        ('Tweet objects', lambda: decode_tweets(json.loads(tweets), ALL_TWEET_FIELDS)),
+        ('TweetColumns', lambda: TweetColumns.from_records(json.loads(tweets))),
+    ]:
+        _, mb = measure(build)
+        print(f"{label:<16} {mb:8.1f} MB per {N} objects")
@@ -0,0 +1,85 @@
+"""
+    Synthetic but realistically shaped API v2 payloads used by the benchmarks.
+"""
+import random
+
+LANGS = ['en', 'es', 'pt', 'fr', 'und']
+SOURCES = ['Twitter for iPhone', 'Twitter for Android', 'Twitter Web App']
+
+
+def user_record(i: int, rng: random.Random) -> dict:
+    username = f'user_{i}_{rng.randint(0, 10**6)}'
+    return {
+        'id': str(10**17 + i),
+        'name': f'User {i}',
+        'username': username,
+        'created_at': f'20{rng.randint(10, 22)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T12:00:00.000Z',
+        'description': 'building things, opinions are my own #python @twitterdev',
+        'entities': {
+            'url': {'urls': [{
+                'start': 0, 'end': 23, 'url': 'https://t.co/abcdefghij',
+                'expanded_url': f'https://{username}.dev', 'display_url': f'{username}.dev'
+            }]},
+            'description': {
+                'hashtags': [{'start': 40, 'end': 47, 'tag': 'python'}],
+                'mentions': [{'start': 48, 'end': 59, 'tag': 'twitterdev'}],
+            },
+        },
+        'location': 'Buenos Aires, Argentina',
+        'pinned_tweet_id': str(10**18 + i),
+        'profile_image_url': f'https://pbs.twimg.com/profile_images/{i}/normal.jpg',
+        'protected': False,
+        'public_metrics': {
+            'followers_count': rng.randint(0, 10**5),
+            'following_count': rng.randint(0, 5000),
+            'tweet_count': rng.randint(0, 10**5),
+            'listed_count': rng.randint(0, 100),
+        },
+        'url': 'https://t.co/abcdefghij',
+        'verified': rng.random() < 0.05,
+    }
+
+
+def tweet_record(i: int, rng: random.Random) -> dict:
+    return {
+        'id': str(10**18 + i),
+        'text': f'tweet number {i} about #python with @twitterdev https://t.co/xyz',
+        'author_id': str(10**17 + rng.randint(0, 1000)),
+        'conversation_id': str(10**18 + i),
+        'created_at': '2022-08-1{}T1{}:00:00.000Z'.format(rng.randint(0, 9), rng.randint(0, 9)),
+        'entities': {
+            'annotations': [{'start': 0, 'end': 4, 'probability': 0.5, 'type': 'Other', 'normalized_text': 'tweet'}],
+            'cashtags': [],
+            'hashtags': [{'start': 23, 'end': 30, 'tag': 'python'}],
+            'mentions': [{'start': 36, 'end': 47, 'tag': 'twitterdev'}],
+            'urls': [{
+                'start': 48, 'end': 64, 'url': 'https://t.co/xyz',
+                'expanded_url': 'https://example.com', 'display_url': 'example.com'
+            }],
+        },
+        'lang': rng.choice(LANGS),
+        'possibly_sensitive': False,
+        'public_metrics': {
+            'retweet_count': rng.randint(0, 100),
+            'reply_count': rng.randint(0, 100),
+            'like_count': rng.randint(0, 1000),
+            'quote_count': rng.randint(0, 10),
+        },
+        'referenced_tweets': [{'type': 'replied_to', 'id': str(10**18 + i + 1)}],
+        'reply_settings': 'everyone',
+        'source': rng.choice(SOURCES),
+    }
+
+
+def users(n: int = 1000, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [user_record(i, rng) for i in range(n)]
+
+
+def tweets(n: int = 1000, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [tweet_record(i, rng) for i in range(n)]
+
+
+def users_page(n: int = 1000, seed: int = 0) -> dict:
+    return {'data': users(n, seed), 'meta': {'result_count': n, 'next_token': 'NEXTTOKEN'}}
@@ -0,0 +1,136 @@
+"""
+    Workers drawing from one get_users budget (900 per window). Each worker
+    has its own RateLimiter, as separate TwitterAPI instances would, and
+    counts the requests it was cleared to send right away. Per process
+    budgets overshoot, the shared backends stay within the window.
+
+    The shared backends are checked first: a budget drawn by several
+    workers never clears more than the limit, the state survives opening
+    the backend again, and a transaction that changes nothing writes
+    nothing.
+
+        python -m benchmarks.shared_limiter
+"""
+import os
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import Pool
+
+from limiter import LIMITER, RateLimiter, MemoryBackend, FileBackend, RedisBackend
+
+WORKERS = 4
+REQUESTS = 300
+
+
+class LocalRedis:
+    """ Stand-in for redis.Redis with the get, set and lock calls RedisBackend uses. """
+    def __init__(self):
+        self.values = {}
+        self.locks = {}
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.writes += 1
+        self.values[key] = value.encode('utf-8') if isinstance(value, str) else value
+
+    @contextmanager
+    def lock(self, name, timeout=None):
+        with self._lock:
+            lock = self.locks.setdefault(name, threading.Lock())
+        if not lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise TimeoutError(name)
+        try:
+            yield
+        finally:
+            lock.release()
+
+
+def cleared(backend) -> int:
+    limiter = RateLimiter(LIMITER, backend=backend)
+    return sum(1 for _ in range(REQUESTS) if limiter.reserve('get_users') == 0)
+
+
+def file_worker(path) -> int:
+    return cleared(FileBackend(path))
+
+
+def memory_worker(_) -> int:
+    return cleared(MemoryBackend())
+
+
+def threads(backend) -> int:
+    results = []
+    workers = [
+        threading.Thread(target=lambda: results.append(cleared(backend)))
+        for _ in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(results)
+
+
+def check_shared_budget(path, redis):
+    limit = LIMITER['get_users']['limit']
+    with Pool(WORKERS) as pool:
+        total = sum(pool.map(file_worker, [path]*WORKERS))
+    assert total == limit, f"FileBackend processes cleared {total} of {limit}"
+    total = threads(RedisBackend(redis))
+    assert total == limit, f"RedisBackend threads cleared {total} of {limit}"
+
+
+def check_reopen(path, redis):
+    for backend, reopen in ((FileBackend(path), lambda: FileBackend(path)), (RedisBackend(redis), lambda: RedisBackend(redis))):
+        limiter = RateLimiter(LIMITER, backend=backend, namespace='reopen')
+        for _ in range(10):
+            limiter.reserve('get_users')
+        left = RateLimiter(LIMITER, backend=reopen(), namespace='reopen').remaining('get_users')
+        assert left < LIMITER['get_users']['limit'] - 9, f"{type(backend).__name__} lost its state: {left} left"
+
+
+def check_unchanged(path, redis):
+    backend = FileBackend(path)
+    with backend.transaction('unchanged') as state:
+        state['tokens'] = 1.0
+    before = os.stat(path)
+    with backend.transaction('unchanged'):
+        pass
+    RateLimiter(LIMITER, backend=backend).reserve('not_throttled')
+    after = os.stat(path)
+    assert (before.st_ino, before.st_mtime_ns) == (after.st_ino, after.st_mtime_ns), "FileBackend rewrote an unchanged state"
+
+    backend = RedisBackend(redis)
+    with backend.transaction('unchanged') as state:
+        state['tokens'] = 1.0
+    writes = redis.writes
+    with backend.transaction('unchanged'):
+        pass
+    RateLimiter(LIMITER, backend=backend).reserve('not_throttled')
+    assert redis.writes == writes, "RedisBackend rewrote an unchanged state"
+
+
+if __name__ == '__main__':
+    for check in (check_shared_budget, check_reopen, check_unchanged):
+        with tempfile.TemporaryDirectory() as tmp:
+            check(os.path.join(tmp, 'rate_limits.json'), LocalRedis())
+    print("checks: ok (shared budget within the limit, state kept on reopen, unchanged state not rewritten)\n")
+
+    limit = LIMITER['get_users']['limit']
+    print(f"{WORKERS} workers x {REQUESTS} requests, get_users budget {limit}\n")
+    with Pool(WORKERS) as pool:
+        print(f"{'MemoryBackend, processes':<36} {sum(pool.map(memory_worker, range(WORKERS))):5d} cleared")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rate_limits.json')
+            print(f"{'FileBackend, processes':<36} {sum(pool.map(file_worker, [path]*WORKERS)):5d} cleared")
+            with open(path) as file:
+                state = json.load(file)['default:get_users']
+            print(f"{'':<36} {state['tokens']:8.1f} tokens left in the shared file")
+    redis = LocalRedis()
+    print(f"{'RedisBackend (LocalRedis), threads':<36} {threads(RedisBackend(redis)):5d} cleared")
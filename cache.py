@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from json_backend import loads
+from constants import DEFAULT_CACHE_TTL, DEFAULT_CACHE_MAX_ENTRIES, DEFAULT_CACHE_PATH
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResponseCache:
+    """
+        Cache of decoded GET responses keyed on the url built by
+        Lookup.create_url and a scope, the token the response was fetched
+        with for user context endpoints. ttls overrides the default ttl per
+        endpoint name, a ttl of 0 disables caching for that endpoint. Every
+        hit returns a fresh copy, callers are free to mutate it.
+    """
+    def __init__(
+        self,
+        ttl: float = DEFAULT_CACHE_TTL,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.ttl)
+
+    @staticmethod
+    def key(url: str, scope: str = '') -> str:
+        return f'{scope} {url}' if scope else url
+
+    def get(self, endpoint: str, url: str, scope: str = '') -> Optional[dict]:
+        if not self.ttl_for(endpoint):
+            return None
+        with self._lock:
+            value = self._get(self.key(url, scope), time.time())
+            if value is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+            return value
+
+    def set(self, endpoint: str, url: str, value: dict, scope: str = '') -> None:
+        ttl = self.ttl_for(endpoint)
+        if not ttl:
+            return
+        with self._lock:
+            self._set(self.key(url, scope), value, time.time() + ttl)
+
+    def _get(self, url, now):
+        raise NotImplementedError
+
+    def _set(self, url, value, expires_at):
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(ResponseCache):
+    """ In process LRU cache, responses are kept serialized. """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entries = OrderedDict()
+
+    def _get(self, url, now):
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < now:
+            del self.entries[url]
+            return None
+        self.entries.move_to_end(url)
+        return loads(value)
+
+    def _set(self, url, value, expires_at):
+        self.entries[url] = (expires_at, json.dumps(value))
+        self.entries.move_to_end(url)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SQLiteCache(ResponseCache):
+    """ On disk cache shared by every process pointing at the same path. """
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'url TEXT PRIMARY KEY, expires_at REAL, accessed_at REAL, body TEXT)'
+        )
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)'
+        )
+
+    def _get(self, url, now):
+        row = self.conn.execute(
+            'SELECT expires_at, body FROM responses WHERE url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        expires_at, body = row
+        if expires_at < now:
+            self.conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            return None
+        self.conn.execute('UPDATE responses SET accessed_at = ? WHERE url = ?', (now, url))
+        return loads(body)
+
+    def _set(self, url, value, expires_at):
+        now = time.time()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)',
+            (url, expires_at, now, json.dumps(value))
+        )
+        self.conn.execute('DELETE FROM responses WHERE expires_at < ?', (now,))
+        self.conn.execute(
+            'DELETE FROM responses WHERE url IN ('
+            'SELECT url FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self.conn.execute('DELETE FROM responses')
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
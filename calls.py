@@ -0,0 +1,449 @@
+"""
+    Endpoint calls shared by TwitterAPI and AsyncTwitterAPI: the options
+    GET and AGET take, pagination, batching, caching and the sync and
+    search bookkeeping. The functions that fetch here run on the sync
+    client; async_api awaits the same steps with its own I/O.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from inspect import signature
+from typing import Any, Callable, Optional
+
+from constants import IMPLEMENTED_MODELS, DEFAULT_INCLUDES_MAX_ENTRIES
+from limiter import page_maximum, page_minimum
+from models.includes import Includes
+from checkpoint import Checkpoint
+from json_backend import parse
+from pipeline import pipelined
+from exceptions import TwitterAPIError
+
+SLEEP, CALL, SEND = range(3)
+
+
+def advance(steps, outcome):
+    """ The next (step, value) of TwitterAPI._request_steps, (None, response) once they return. """
+    try:
+        return steps.send(outcome)
+    except StopIteration as done:
+        return None, done.value
+
+
+def page_request(lookup, name, url, limit, fetched):
+    """ Asks only for the results still missing when they fit in less than a page. """
+    page_size = lookup.page_size
+    if limit is not None and page_size and limit - fetched < page_size:
+        return lookup.sized_url(url, max(limit - fetched, page_minimum(name)))
+    return url
+
+
+def trim_page(page, limit, fetched):
+    data = page.get('data')
+    if limit is not None and isinstance(data, list) and len(data) > limit - fetched:
+        page['data'] = data[:max(limit - fetched, 0)]
+    return page
+
+
+def cut_page(page, stop_when):
+    """ Drops the results from the first one stop_when is true for, True if there was one. """
+    data = page.get('data')
+    if stop_when is None or not isinstance(data, list):
+        return False
+    for i, record in enumerate(data):
+        if stop_when(record):
+            page['data'] = data[:i]
+            return True
+    return False
+
+
+def count_results(pages):
+    return sum(len(page.get('data') or []) for page in pages)
+
+
+class Pager:
+    """
+        Page bookkeeping of a paginated call, shared by paginator and
+        async_paginator which only fetch. Pages come until next_token runs
+        out or limit results (None for no limit) are in. The page size is
+        the lookup's max_results; the last request asks only for what is
+        missing and its page is trimmed to it. stop_when(record) ends the
+        crawl at the first result it is true for, that result and the ones
+        after it are dropped.
+
+        checkpoint=True, a state file path or a Checkpoint replays the
+        pages stored in it and resumes from its next_token, saving every
+        new page. The checkpoint is cleared once the crawl completes.
+    """
+    def __init__(self, tapi, name, lookup, limit, checkpoint=None, save=False, stop_when=None):
+        self.tapi = tapi
+        self.name = name
+        self.lookup = lookup
+        self.limit = limit
+        self.save = save
+        self.stop_when = stop_when
+        self.url = lookup.create_url()
+        if checkpoint and not isinstance(checkpoint, Checkpoint):
+            checkpoint = Checkpoint.for_lookup(name, self.url) if checkpoint is True else Checkpoint(checkpoint)
+        self.checkpoint = checkpoint or None
+        self.n_pages, self.fetched, next_token = checkpoint.load(self.url) if checkpoint else (0, 0, None)
+        self.resumed = self.n_pages
+        if self.resumed and not next_token:
+            self.next_url = None
+        else:
+            self.next_url = lookup.page_url(self.url, next_token) if next_token else self.url
+
+    def replayed(self):
+        """ The pages the checkpoint already holds, read lazily. """
+        return self.checkpoint.replay(self.resumed) if self.resumed else iter(())
+
+    def request_url(self):
+        """ Url of the next page, None once the crawl is done. """
+        if not self.next_url or (self.limit is not None and self.fetched >= self.limit):
+            return None
+        return page_request(self.lookup, self.name, self.next_url, self.limit, self.fetched)
+
+    def turn(self, response):
+        """ The page of response, counted, remembered, saved and checkpointed. """
+        response.raise_for_status()
+        page = trim_page(parse(response), self.limit, self.fetched)
+        stopped = cut_page(page, self.stop_when)
+        self.fetched += count_results([page])
+        remember(self.tapi, self.lookup, page)
+        if self.save:
+            self.lookup.save_response(page, self.name, self.tapi.storage)
+        self.next_url = None if stopped else self.lookup.next_page(self.url, page)
+        if self.checkpoint:
+            self.n_pages += 1
+            self.checkpoint.save(self.url, page, self.n_pages, self.fetched)
+        return page
+
+    def finish(self):
+        if self.checkpoint:
+            self.checkpoint.clear()
+
+
+def paginator(tapi, name, lookup, limit, app_only_auth, checkpoint=None, save=False, stop_when=None):
+    """ Yields the pages of lookup, see Pager. """
+    pager = Pager(tapi, name, lookup, limit, checkpoint, save, stop_when)
+    yield from pager.replayed()
+    url = pager.request_url()
+    while url:
+        yield pager.turn(tapi._get(url, app_only_auth, name))
+        url = pager.request_url()
+    pager.finish()
+
+
+def paginate_response(tapi, name, lookup, app_only_auth, options):
+    pages = paginator(tapi, name, lookup, options.limit, app_only_auth, options.checkpoint, options.save, options.stop_when)
+    return lookup.paginate_responses(list(pages))
+
+
+def page_decoder(lookup, columnar):
+    """
+        Decodes a page into a Columns batch, or into objects sharing the
+        includes of earlier pages. The shared index is an LRU of at most
+        DEFAULT_INCLUDES_MAX_ENTRIES entries per kind, so a long crawl does
+        not keep every author, media item, place and referenced tweet it
+        saw; an author that fell out of it is decoded again when a later
+        page includes it.
+    """
+    includes = Includes(max_entries=DEFAULT_INCLUDES_MAX_ENTRIES)
+    return lookup.columnar if columnar else lambda page: lookup.datify(page, includes)
+
+
+def column_sink(lookup):
+    """ (columns, append) where append(page) extends the single Columns batch with page. """
+    columns = lookup.columns()
+
+    def append(page):
+        data = page.get('data') or []
+        columns.extend([data] if isinstance(data, dict) else data)
+
+    return columns, append
+
+
+def stream_response(tapi, name, lookup, app_only_auth, options):
+    """
+        Yields the results page by page. With prefetch, pages are fetched and
+        decoded on worker threads that run up to prefetch pages ahead, see
+        pipeline.pipelined.
+    """
+    decode = page_decoder(lookup, options.columnar)
+    results = paginator(tapi, name, lookup, options.limit, app_only_auth, options.checkpoint, options.save, options.stop_when)
+    results = pipelined(results, decode, options.prefetch) if options.prefetch else map(decode, results)
+    try:
+        for data in results:
+            if options.columnar:
+                yield data
+            elif data:
+                yield from data
+    except TwitterAPIError:
+        raise
+    except Exception as e:
+        print(f"Failed to stream {name}: {type(e)} {e}")
+
+
+def columnar_response(tapi, name, lookup, app_only_auth, options):
+    """ One Columns batch of every page, each page appended on the decode worker as soon as it is fetched. """
+    columns, append = column_sink(lookup)
+    results = paginator(tapi, name, lookup, options.limit, app_only_auth, options.checkpoint, options.save, options.stop_when)
+    for _ in pipelined(results, append, options.prefetch):
+        pass
+    return columns
+
+
+@dataclass
+class CallOptions:
+    """ The keyword arguments GET and AGET endpoints take besides the ones of the endpoint, see GET. """
+    stream: bool = False
+    save: bool = False
+    max_age: Optional[float] = None
+    checkpoint: Any = None
+    columnar: bool = False
+    page_size: Optional[int] = None
+    stop_when: Optional[Callable[[dict], bool]] = None
+    prefetch: int = 0
+    limit: Optional[int] = None
+
+    @staticmethod
+    def save_default(method):
+        """ The save default the endpoint declares, False when it has none. """
+        save = signature(method).parameters.get('save')
+        return save.default if save else False
+
+    @classmethod
+    def pop(cls, method, save_default, self, args, kwargs):
+        """ Takes the options out of kwargs, limit defaults to the max_results of the call. """
+        return cls(
+            stream=kwargs.pop('stream', False),
+            save=kwargs.pop('save', save_default),
+            max_age=kwargs.pop('max_age', None),
+            checkpoint=kwargs.pop('checkpoint', None),
+            columnar=kwargs.pop('columnar', False),
+            page_size=kwargs.pop('page_size', None),
+            stop_when=kwargs.pop('stop_when', None),
+            prefetch=kwargs.pop('prefetch', 0),
+            limit=kwargs.pop('limit') if 'limit' in kwargs else call_argument(method, self, args, kwargs, 'max_results'),
+        )
+
+    def route(self, pagination, batch):
+        """ How the call is answered: 'columns', 'stream', 'batch', 'single' or 'pages'. """
+        if pagination and self.prefetch and self.columnar and not self.stream:
+            return 'columns'
+        if pagination and (self.stream or self.prefetch):
+            return 'stream'
+        if batch:
+            return 'batch'
+        return 'pages' if pagination else 'single'
+
+
+def call_lookup(method, pagination, options, self, args, kwargs):
+    lookup = method(self, *args, **kwargs)
+    if pagination:
+        lookup = sized_lookup(method.__name__, lookup, options.limit, options.page_size)
+    return lookup
+
+
+def batch_lookups(tapi, lookup, batch, max_age):
+    """ (known, lookups): the records a LocalStore already has by id and the requests fetching the rest. """
+    values = lookup.query[batch]
+    known = stored(tapi, lookup, batch, values, max_age)
+    missing = replace(lookup, query={**lookup.query, batch: [v for v in values if v not in known]})
+    return known, missing.split(batch)
+
+
+def merge_batch(tapi, lookup, batch, known, responses):
+    for response in responses:
+        remember(tapi, lookup, response)
+    if known:
+        responses.append({'data': list(known.values())})
+    return lookup.merge_batches(responses, batch, lookup.query[batch])
+
+
+def single_response(tapi, lookup, res):
+    res = res if res.get('data') else {}
+    remember(tapi, lookup, res)
+    return res
+
+
+def finish_response(tapi, name, lookup, res, options, pagination):
+    if options.save and not pagination:
+        lookup.save_response(res, name, tapi.storage)
+    if options.columnar:
+        return lookup.columnar(res)
+    return lookup.datify(res)
+
+
+def report_failure(name, e, res):
+    print(f"Failed to get {name}: {type(e)} {e}")
+    try:
+        print(getattr(e, 'response', res).json().get('errors'),'\n')
+    except Exception:
+        pass
+
+
+def call_argument(method, self, args, kwargs, name):
+    """ The value of argument name in a call of method, given positionally, by keyword or by default. """
+    try:
+        arguments = signature(method).bind(self, *args, **kwargs)
+    except TypeError:
+        return None
+    arguments.apply_defaults()
+    return arguments.arguments.get(name)
+
+
+def sized_lookup(name, lookup, limit, page_size=None):
+    """
+        Pages of page_size results, by default as many as limit needs, within
+        the page size bounds of the endpoint (see limiter.LIMITER).
+    """
+    page_size = min(page_size or limit or page_maximum(name), page_maximum(name))
+    return lookup.sized(max(page_size, page_minimum(name)))
+
+
+def sync_lookup(tapi, endpoint, user_id, kwargs):
+    """ Builds the lookup of endpoint for user_id starting after its stored watermark. """
+    if tapi.store is None:
+        raise ValueError("Incremental sync needs a LocalStore: TwitterAPI(..., store=LocalStore()).")
+    key = f'{endpoint.__name__}:{user_id}'
+    query = dict(kwargs.pop('query', None) or {})
+    since_id = tapi.store.watermark(key)
+    if since_id:
+        query['since_id'] = since_id
+    cursor = tapi.store.cursor(key)
+    if cursor:
+        query['until_id'] = cursor[0]
+    return key, endpoint.lookup(tapi, user_id, query=query, **kwargs)
+
+
+def merge_tweets(lookup, responses):
+    """ Merges tweet pages deduplicated by id, newest first. """
+    merged = lookup.paginate_responses([res for res in responses if res.get('data')])
+    if merged.get('data'):
+        tweets = {tweet['id']: tweet for tweet in merged['data']}
+        merged['data'] = sorted(tweets.values(), key=lambda tweet: int(tweet['id']), reverse=True)
+    return merged
+
+
+def exhausted(responses):
+    """ True if the pages reach the end of the results, the last one not cut short by limit. """
+    if not responses:
+        return True
+    meta = responses[-1].get('meta') or {}
+    returned = len(responses[-1].get('data') or [])
+    return not meta.get('next_token') and meta.get('result_count', returned) <= returned
+
+
+def merge_sync(tapi, key, lookup, responses):
+    """
+        Merges the pages of a sync. The watermark moves to the newest id
+        only once every tweet after it is in: when limit cuts the sync
+        short, a cursor keeps the oldest id fetched and the next sync
+        fetches the tweets between the watermark and it first. Pages were
+        already upserted by the paginator, the watermark only moves once
+        all of them are in so an interrupted sync starts again from the
+        same since_id.
+    """
+    merged = merge_tweets(lookup, responses)
+    data = merged.get('data') or []
+    cursor = tapi.store.cursor(key)
+    head = cursor[1] if cursor else (data[0]['id'] if data else None)
+    if exhausted(responses):
+        if head:
+            tapi.store.set_watermark(key, head)
+        tapi.store.clear_cursor(key)
+    elif data:
+        tapi.store.set_cursor(key, data[-1]['id'], head)
+    return lookup.datify(merged) if data else []
+
+
+def volume_slices(buckets, n, start_time=None, end_time=None):
+    """
+        Cuts consecutive tweet count buckets into at most n time windows
+        holding about the same number of tweets. Returns [(start, end, volume)],
+        the outer bounds are start_time and end_time as given.
+    """
+    total = sum(bucket['tweet_count'] for bucket in buckets)
+    if not total:
+        return [(start_time, end_time, 0)]
+    slices, start, cumulative, volume = [], start_time, 0, 0
+    for bucket in buckets[:-1]:
+        cumulative += bucket['tweet_count']
+        volume += bucket['tweet_count']
+        if volume and len(slices) < n-1 and cumulative >= total*(len(slices)+1)/n:
+            slices.append((start, bucket['end'], volume))
+            start, volume = bucket['end'], 0
+    slices.append((start, end_time, volume + buckets[-1]['tweet_count']))
+    return slices
+
+
+def count_lookups(tapi, endpoint, qqueries, start_time, end_time, granularity):
+    """ A lookup of the counts endpoint per query. """
+    return [
+        endpoint.lookup(
+            tapi, start_time=start_time, end_time=end_time, granularity=granularity, qquery=qquery
+        ) for qquery in qqueries
+    ]
+
+
+def search_slices(tapi, endpoint, qquery, start_time, end_time, n, granularity):
+    lookup, = count_lookups(tapi, endpoint, [qquery], start_time, end_time, granularity)
+    counts = fetch(tapi, 'tweet_recent_count', lookup.create_url(), True)
+    return volume_slices(counts.get('data', []), n, start_time, end_time)
+
+
+def search_lookups(tapi, endpoint, qquery, windows, kwargs):
+    """ A lookup of the search endpoint per (start, end, volume) window. """
+    return [
+        endpoint.lookup(
+            tapi, qquery=qquery, start_time=start, end_time=end, **kwargs
+        ) for start, end, _ in windows
+    ]
+
+
+def merge_crawl(lookups, crawled):
+    """ Tweets of the pages crawled for every lookup, deduplicated by id and newest first. """
+    responses = [page for pages in crawled for page in pages]
+    return lookups[0].datify(merge_tweets(lookups[0], responses)) or []
+
+
+def remember(tapi, lookup, response):
+    if tapi.store is not None and lookup.kind in IMPLEMENTED_MODELS and response.get('data'):
+        data = response['data']
+        tapi.store.upsert(lookup.kind, [data] if isinstance(data, dict) else data, fields=lookup.fields)
+
+
+def stored(tapi, lookup, key, values, max_age=None):
+    """ Records of the LocalStore fresh enough, and with the fields asked for, to skip fetching, by id. """
+    if tapi.store is None or key != 'ids':
+        return {}
+    max_age = tapi.store.max_age if max_age is None else max_age
+    return tapi.store.get(lookup.kind, values, max_age, lookup.fields)
+
+
+def cached(tapi, name, url, app_only_auth):
+    """ (scope, response): the cache scope of the request and its cached response, None when missing. """
+    scope = tapi._cache_scope(app_only_auth)
+    return scope, (tapi.cache.get(name, url, scope) if scope is not None else None)
+
+
+def cache_response(tapi, name, url, scope, response):
+    response.raise_for_status()
+    res = parse(response)
+    if scope is not None:
+        tapi.cache.set(name, url, res, scope)
+    return res
+
+
+def fetch(tapi, name, url, app_only_auth):
+    scope, res = cached(tapi, name, url, app_only_auth)
+    if res is not None:
+        return res
+    return cache_response(tapi, name, url, scope, tapi._get(url, app_only_auth, name))
+
+
+def fetch_batches(tapi, name, lookups, app_only_auth):
+    urls = [lookup.create_url() for lookup in lookups]
+    if len(urls) == 1:
+        return [fetch(tapi, name, urls[0], app_only_auth)]
+    with ThreadPoolExecutor(max_workers=tapi.max_workers) as executor:
+        return list(executor.map(lambda url: fetch(tapi, name, url, app_only_auth), urls))
@@ -0,0 +1,91 @@
+import os
+import json
+import hashlib
+from typing import Iterator, Optional, Tuple
+
+from constants import DEFAULT_CHECKPOINT_DIR
+from files import read_json, write_json
+
+
+class Checkpoint:
+    """
+        Progress of a paginated crawl: the pages fetched so far, appended to
+        <path>.pages.jsonl, and the next_token to resume from, kept in <path>.
+        The state is only valid for the url it was created with. Resuming
+        reads the stored pages back one at a time, a long crawl is never
+        held in memory at once.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.pages_path = f'{path}.pages.jsonl'
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    @classmethod
+    def for_lookup(cls, name: str, url: str, directory: str = DEFAULT_CHECKPOINT_DIR):
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        return cls(os.path.join(directory, f'{name}_{digest}.json'))
+
+    def load(self, url: str) -> Tuple[int, int, Optional[str]]:
+        """
+            Returns (pages, results, next_token) stored for url, or (0, 0,
+            None) to start over. The pages are only checked here, replay
+            reads them back one at a time.
+        """
+        state = read_json(self.path)
+        if state is None or state.get('url') != url:
+            return 0, 0, None
+
+        n_pages, results = 0, state.get('results')
+        count = results is None
+        results = results or 0
+        try:
+            with open(self.pages_path, 'rb+') as file:
+                for _ in range(state['pages']):
+                    line = file.readline()
+                    if not line.endswith(b'\n'):
+                        break
+                    n_pages += 1
+                    if count:
+                        results += len(json.loads(line).get('data') or [])
+                # a crash between appending a page and replacing the state
+                # leaves lines the state does not count, resuming appends
+                # after the counted ones
+                file.truncate()
+        except FileNotFoundError:
+            return 0, 0, None
+        if n_pages != state['pages']:
+            return 0, 0, None
+        return n_pages, results, state.get('next_token')
+
+    def replay(self, n_pages: int) -> Iterator[dict]:
+        """ Yields the first n_pages stored pages, reading them as they are consumed. """
+        if not n_pages:
+            return
+        with open(self.pages_path, 'rb') as file:
+            for _ in range(n_pages):
+                yield json.loads(file.readline())
+
+    def save(self, url: str, page: dict, n_pages: int, results: Optional[int] = None) -> None:
+        if n_pages == 1:
+            open(self.pages_path, 'w').close()
+        with open(self.pages_path, 'a') as file:
+            file.write(json.dumps(page) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+        state = {
+            'url': url,
+            'pages': n_pages,
+            'next_token': page.get('meta', {}).get('next_token'),
+        }
+        if results is not None:
+            state['results'] = results
+        write_json(self.path, state)
+
+    def clear(self) -> None:
+        for path in (self.path, self.pages_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -5,6 +5,21 @@ MAX_PAGES = 10
 MAX_USERS_ID = 100
 REFRESH_MARGIN = 60
 REFRESH_REFRESH_MARGIN = 43200
+RATE_LIMIT_WINDOW = 15*60
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_CACHE_TTL = 5*60
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+DEFAULT_CACHE_PATH = 'data/cache/responses.sqlite'
+DEFAULT_INCLUDES_MAX_ENTRIES = 5000
+DEFAULT_CHECKPOINT_DIR = 'data/checkpoints'
+DEFAULT_DATA_DIR = 'data'
+DEFAULT_SEGMENT_BYTES = 64*2**20
+DEFAULT_LOCAL_STORE_PATH = 'data/store.sqlite'
+DEFAULT_LOCAL_STORE_MAX_AGE = 24*60*60
+DEFAULT_SYNC_LIMIT = 3200
+DEFAULT_RATE_LIMIT_PATH = 'data/rate_limits.json'
+DEFAULT_TOKEN_PATH = 'data/saved_tokens/twitter.token'
 
 ALL_USER_FIELDS = [
     'id',
@@ -0,0 +1,170 @@
+import hashlib
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+from constants import REFRESH_MARGIN
+from limiter import LIMITER, RateLimiter, parse_rate_limit_headers
+from files import read_json, write_json
+
+
+def newer_token(saved: Optional[dict], token: Optional[dict]) -> bool:
+    """ True if saved is a token refreshed after token, by another client or process. """
+    if not saved or not token:
+        return False
+    return saved.get('access_token') != token.get('access_token') \
+        and saved.get('expires_at', 0) >= token.get('expires_at', 0)
+
+
+class Credential:
+    """
+        An app bearer token (str) or an OAuth2 user token (dict with
+        access_token, refresh_token and expires_at) with its own rate limit
+        budgets, tracked from the headers of the responses it got. In a
+        shared limiter backend the budgets are kept under name, path or a
+        fingerprint of the token.
+
+        Refreshing a user token rotates its refresh token, so a refreshed
+        token is written back to path, when given, and passed to
+        on_refresh(credential).
+    """
+    def __init__(
+        self,
+        token: Union[str, dict],
+        name: Optional[str] = None,
+        limits: dict = LIMITER,
+        backend=None,
+        path: Optional[str] = None,
+        on_refresh: Optional[Callable[['Credential'], None]] = None,
+    ):
+        self.token = token
+        self.app_only = isinstance(token, str)
+        self.name = name
+        self.path = path
+        self.on_refresh = on_refresh
+        self.limiter = RateLimiter(limits, backend=backend, namespace=name or path or self.fingerprint)
+        self.revoked = False
+
+    @classmethod
+    def from_file(cls, path: str, name: Optional[str] = None, **kwargs) -> 'Credential':
+        """ A user token saved as json at path, refreshed tokens are saved back to it. """
+        token = read_json(path)
+        if token is None:
+            raise ValueError(f"No token saved at {path}.")
+        return cls(token, name, path=path, **kwargs)
+
+    def reload(self) -> bool:
+        """ Adopts the token saved at path if another process refreshed it since, True if it did. """
+        if self.path is None or self.app_only:
+            return False
+        saved = read_json(self.path)
+        if not newer_token(saved, self.token):
+            return False
+        self.token = saved
+        return True
+
+    def refreshed(self, token: dict) -> None:
+        """ Keeps a refreshed token: in memory, at path and through on_refresh. """
+        self.token = token
+        if self.path is not None:
+            write_json(self.path, token)
+        if self.on_refresh is not None:
+            self.on_refresh(self)
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(self.access_token.encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def access_token(self) -> str:
+        return self.token if self.app_only else self.token['access_token']
+
+    def should_refresh(self) -> bool:
+        return not self.app_only and time.time() + REFRESH_MARGIN > self.token.get('expires_at', 0)
+
+    def __repr__(self) -> str:
+        kind = 'app' if self.app_only else 'user'
+        return f"Credential({self.name or kind!r}, revoked={self.revoked})"
+
+
+class CredentialPool:
+    """
+        Routes every request to the credential with the most budget left for
+        its endpoint, app bearer tokens for app only endpoints and user
+        tokens for the rest. A credential answered with 401 is revoked, one
+        answered with 429 is exhausted until its reset, and the request
+        fails over to the next credential while any has budget. Budgets
+        are shared by the processes of a host through the default limiter
+        backend, pass a RedisBackend to share them across hosts.
+
+        User tokens are token dicts or paths of tokens saved as json, which
+        then keep the refreshed tokens. on_refresh(credential) is called
+        with every refreshed credential, to persist tokens elsewhere.
+
+            pool = CredentialPool(
+                bearer_tokens=[BEARER_A, BEARER_B],
+                user_tokens=['data/saved_tokens/alice.token', token]
+            )
+            twitter = TwitterAPI(client_id, client_secret, credentials=pool)
+    """
+    def __init__(
+        self,
+        bearer_tokens: Iterable[str] = (),
+        user_tokens: Iterable[Union[dict, str]] = (),
+        limits: dict = LIMITER,
+        backend=None,
+        on_refresh: Optional[Callable[[Credential], None]] = None,
+    ):
+        self.limits = limits
+        self.backend = backend
+        self.on_refresh = on_refresh
+        self.credentials: List[Credential] = []
+        self._lock = threading.Lock()
+        for token in bearer_tokens:
+            self.add(token)
+        for token in user_tokens:
+            if isinstance(token, str):
+                token = Credential.from_file(token, limits=limits, backend=backend, on_refresh=on_refresh)
+            self.add(token)
+
+    def add(self, token: Union[str, dict, Credential], name: Optional[str] = None) -> Credential:
+        credential = token if isinstance(token, Credential) \
+            else Credential(token, name, self.limits, self.backend, on_refresh=self.on_refresh)
+        with self._lock:
+            self.credentials.append(credential)
+        return credential
+
+    def usable(self, app_only_auth: bool) -> List[Credential]:
+        return [
+            credential for credential in self.credentials
+            if credential.app_only == bool(app_only_auth) and not credential.revoked
+        ]
+
+    def checkout(self, endpoint: Optional[str], app_only_auth: bool) -> Tuple[Optional[Credential], float]:
+        """
+            Picks the credential with the most remaining budget and reserves
+            one request on it. Returns (credential, seconds to wait), or
+            (None, 0) when the pool holds no usable credential of that kind.
+        """
+        with self._lock:
+            credentials = self.usable(app_only_auth)
+            if not credentials:
+                return None, 0.0
+            if not endpoint:
+                return credentials[0], 0.0
+            credential = max(credentials, key=lambda credential: credential.limiter.remaining(endpoint))
+            return credential, credential.limiter.reserve(endpoint)
+
+    def failover(self, credential: Credential, endpoint: Optional[str], response) -> bool:
+        """ Records a 401/429 response of credential, True if another credential can take the request. """
+        if response.status_code == 401:
+            credential.revoked = True
+        elif response.status_code == 429 and endpoint:
+            rate_limit = parse_rate_limit_headers(response.headers)
+            credential.limiter.exhaust(endpoint, rate_limit[1] if rate_limit else None)
+        else:
+            return False
+        return any(
+            other is not credential and (not endpoint or other.limiter.remaining(endpoint) >= 1)
+            for other in self.usable(credential.app_only)
+        )
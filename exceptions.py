@@ -0,0 +1,44 @@
+class TwitterAPIError(Exception):
+    """ Request that still failed once the retry policy gave up on it. """
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+        self.status_code = getattr(response, 'status_code', None)
+        self.errors = None
+        try:
+            body = response.json()
+            self.errors = body.get('errors') or body.get('detail')
+        except Exception:
+            pass
+
+
+class RateLimitError(TwitterAPIError):
+    pass
+
+
+class ServerError(TwitterAPIError):
+    pass
+
+
+class ClientError(TwitterAPIError):
+    pass
+
+
+class UnauthorizedError(ClientError):
+    pass
+
+
+class ConnectionFailedError(TwitterAPIError):
+    pass
+
+
+def error_for_response(response, attempts=1) -> TwitterAPIError:
+    status = response.status_code
+    message = f"{status} for {response.url} after {attempts} attempt(s)"
+    if status == 429:
+        return RateLimitError(message, response)
+    if status in (401, 403):
+        return UnauthorizedError(message, response)
+    if status >= 500:
+        return ServerError(message, response)
+    return ClientError(message, response)
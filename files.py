@@ -0,0 +1,69 @@
+"""
+    The file helpers of every state file the clients share between
+    processes (tokens, pooled credentials, checkpoints and rate limit
+    budgets): an exclusive lock and atomic json reads and writes.
+"""
+import os
+import json
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+HAS_FLOCK = fcntl is not None
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def ensure_dir(path: str) -> None:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+        Exclusive lock of path, held by one thread of this process at a
+        time and, through an flock of <path>.lock, by one process. Only the
+        thread lock where fcntl is missing.
+    """
+    with _locks_lock:
+        lock = _locks.setdefault(os.path.abspath(path), threading.Lock())
+    ensure_dir(path)
+    with lock, open(f'{path}.lock', 'a') as file:
+        if fcntl:
+            fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def read_json(path: str, default=None):
+    """ The json saved at path, default when it is missing or not valid json. """
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return default
+
+
+def write_json(path: str, value, durable: bool = True) -> None:
+    """
+        Writes value to a temporary file renamed over path, readers never
+        see it half written. durable fsyncs it first, so a crash right
+        after does not leave an empty file behind the rename.
+    """
+    ensure_dir(path)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w') as file:
+        json.dump(value, file)
+        if durable:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(tmp, path)
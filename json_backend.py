@@ -0,0 +1,59 @@
+"""
+    Parser of the response bodies. orjson, or simdjson, when installed and
+    the standard library json otherwise; set_backend picks one explicitly.
+    Every body is parsed once, by parse(response), and the resulting dict is
+    what pagination, the caches, storage and the decoders share.
+"""
+import json
+
+
+def _orjson():
+    import orjson
+    return orjson.loads
+
+
+def _simdjson():
+    import simdjson
+    return simdjson.loads
+
+
+def _json():
+    return json.loads
+
+
+BACKENDS = {
+    'orjson': _orjson,
+    'simdjson': _simdjson,
+    'json': _json,
+}
+
+backend = None
+_loads = json.loads
+
+
+def set_backend(name: str = None) -> str:
+    """ Uses the backend name, or the fastest installed one, and returns its name. """
+    global backend, _loads
+    if name is not None and name not in BACKENDS:
+        raise ValueError(f"backend must be one of {tuple(BACKENDS)}")
+    for candidate in [name] if name else BACKENDS:
+        try:
+            _loads = BACKENDS[candidate]()
+        except ImportError:
+            if name:
+                raise
+            continue
+        backend = candidate
+        return backend
+
+
+def loads(data):
+    return _loads(data)
+
+
+def parse(response):
+    """ The json body of a requests/httpx response. """
+    return _loads(response.content)
+
+
+set_backend()
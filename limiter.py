@@ -1,3 +1,12 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from constants import RATE_LIMIT_WINDOW, DEFAULT_RATE_LIMIT_PATH, MAX_RESULTS_PER_PAGE_DEFAULT
+from files import HAS_FLOCK, file_lock, read_json, write_json
+
 LIMITER = {
     "get_users": { 
         'scopes' : ['tweet.read', 'user.read', 'offline.access'],
@@ -22,16 +31,19 @@ LIMITER = {
     "get_user_followed_lists": { 
         'scopes' : ['tweet.read', 'user.read', 'list.read' 'offline.access'],
         'limit': 15,
+        'page_size': 100,
         'auth': 'BEARER_TOKEN'
     },
     "get_user_list_membership": { 
         'scopes' : ['tweet.read', 'user.read', 'list.read' 'offline.access'],
         'limit': 15,
+        'page_size': 100,
         'auth': 'BEARER_TOKEN'
     },
     "get_users_owned_lists": { 
         'scopes' : ['tweet.read', 'user.read', 'list.read' 'offline.access'],
         'limit': 15,
+        'page_size': 100,
         'auth': 'BEARER_TOKEN'
     },
     "get_users_pinned_lists": { 
@@ -42,41 +54,51 @@ LIMITER = {
     "get_user_followers": { 
         'scopes' : ['tweet.read', 'user.read', 'follows.read', 'offline.access'],
         'limit': 15,
+        'page_size': 1000,
         'auth': 'BEARER_TOKEN'
     },
     "get_user_following": { 
         'scopes' : ['tweet.read', 'user.read', 'follows.read', 'offline.access'],
         'limit': 15,
+        'page_size': 1000,
         'auth': 'BEARER_TOKEN'
     },
     "get_user_liked_tweets": { 
         'scopes' : ['tweet.read', 'user.read', 'like.read', 'offline.access'],
         'limit': 75,
+        'page_size': 100,
+        'min_page_size': 10,
         'auth': 'BEARER_TOKEN'
     },
     "get_users_that_liked_tweet": { 
         'scopes' : ['tweet.read', 'user.read', 'like.read', 'offline.access'],
         'limit': 75,
+        'page_size': 100,
         'auth': 'BEARER_TOKEN'
     },
     "get_users_that_follow_list": {
         'scopes': ['tweet.read', 'users.read', 'list.read', 'offline.access'],
         'limit': 180,
+        'page_size': 100,
         'auth': 'BEARER_TOKEN'
     },
     "get_list_members": {
         'scopes': ['tweet.read', 'users.read', 'list.read', 'offline.access'],
         'limit': 900,
+        'page_size': 100,
         'auth': 'BEARER_TOKEN'
     },
     "get_user_mentions": { 
         'scopes' : ['tweet.read', 'user.read', 'offline.access'],
         'limit': 180,
+        'page_size': 100,
+        'min_page_size': 5,
         'auth': 'BEARER_TOKEN'
     },
     "get_user_timelines_reverse_chronological": { 
         'scopes' : ['tweet.read', 'user.read', 'offline.access'],
         'limit': 180,
+        'page_size': 100,
         'auth': 'OAUTH_SIGNATURE'
     },
     "get_me": { 
@@ -87,16 +109,19 @@ LIMITER = {
     "get_blocked_users": { 
         'scopes' : ['tweet.read', 'user.read', 'block.read', 'offline.access'],
         'limit': 15,
+        'page_size': 1000,
         'auth': 'OAUTH_SIGNATURE'
     },
     "get_users_muted": { 
         'scopes' : ['tweet.read', 'user.read', 'mute.read', 'offline.access'],
         'limit': 15,
+        'page_size': 1000,
         'auth': 'OAUTH_SIGNATURE'
     },
     "get_users_that_retweeted": { 
         'scopes' : ['tweet.read', 'user.read', 'offline.access'],
         'limit': 75,
+        'page_size': 100,
         'auth': 'BEARER_TOKEN'
     },
     'post_tweet': {
@@ -104,9 +129,287 @@ LIMITER = {
         'limit': 200,
         'auth': 'OAUTH_SIGNATURE'
     },
+    "get_tweets": {
+        'scopes' : ['tweet.read', 'users.read', 'offline.access'],
+        'limit': 900,
+        'auth': 'BEARER_TOKEN'
+    },
+    "get_user_bookmarked_tweets": {
+        'scopes' : ['tweet.read', 'users.read', 'bookmark.read', 'offline.access'],
+        'limit': 180,
+        'page_size': 100,
+        'auth': 'OAUTH_SIGNATURE'
+    },
+    "get_tweet": {
+        'scopes' : ['tweet.read', 'users.read', 'offline.access'],
+        'limit': 900,
+        'auth': 'BEARER_TOKEN'
+    },
+    "get_tweet_quotes": {
+        'scopes' : ['tweet.read', 'users.read', 'offline.access'],
+        'limit': 75,
+        'page_size': 100,
+        'min_page_size': 10,
+        'auth': 'BEARER_TOKEN'
+    },
     'tweet_recent_search': {
         'scopes': ['tweet.read', 'tweet.write', 'users.read', 'offline.access'],
         'limit': 450,
+        'page_size': 100,
+        'min_page_size': 10,
+        'auth': 'BEARER_TOKEN'
+    },
+    'tweet_recent_count': {
+        'scopes': ['tweet.read', 'users.read', 'offline.access'],
+        'limit': 300,
         'auth': 'BEARER_TOKEN'
     }
-}
\ No newline at end of file
+}
+
+
+def page_maximum(name: str) -> int:
+    """ Largest max_results a request of the paginated endpoint name accepts. """
+    return LIMITER.get(name, {}).get('page_size', MAX_RESULTS_PER_PAGE_DEFAULT)
+
+
+def page_minimum(name: str) -> int:
+    return LIMITER.get(name, {}).get('min_page_size', 1)
+
+
+class TokenBucket:
+    """
+        Per endpoint request budget. Starts as a token bucket seeded with the
+        documented limit and switches to the server's fixed window as soon as
+        x-rate-limit-* headers are seen.
+    """
+    def __init__(self, limit: int, window: int = RATE_LIMIT_WINDOW):
+        self.limit = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.reset_at = None
+        self.updated = time.time()
+
+    @classmethod
+    def load(cls, state: dict, window: int = RATE_LIMIT_WINDOW):
+        bucket = cls(state['limit'], window)
+        bucket.tokens = state['tokens']
+        bucket.reset_at = state['reset_at']
+        bucket.updated = state['updated']
+        return bucket
+
+    def dump(self) -> dict:
+        return {
+            'limit': self.limit,
+            'tokens': self.tokens,
+            'reset_at': self.reset_at,
+            'updated': self.updated,
+        }
+
+    def _refill(self, now: float) -> None:
+        if self.reset_at is not None:
+            if now >= self.reset_at:
+                windows = 1 + int((now - self.reset_at) // self.window)
+                self.tokens = min(self.limit, self.tokens + windows*self.limit)
+                self.reset_at = None
+        else:
+            rate = self.limit / self.window
+            self.tokens = min(self.limit, self.tokens + (now - self.updated)*rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """ Takes one token and returns how many seconds to wait before using it. """
+        now = time.time()
+        self._refill(now)
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        debt = -self.tokens
+        if self.reset_at is not None:
+            return self.reset_at - now + (math.ceil(debt/self.limit) - 1)*self.window
+        return debt * self.window / self.limit
+
+    def update(self, remaining: int, reset: float, limit: int = None) -> None:
+        if limit:
+            self.limit = limit
+        if self.reset_at is None or reset > self.reset_at:
+            self.tokens = float(remaining)
+        else:
+            self.tokens = min(self.tokens, float(remaining))
+        self.reset_at = reset
+        self.updated = time.time()
+
+
+class MemoryBackend:
+    """ Bucket states of a single process. """
+    def __init__(self):
+        self.states = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def transaction(self, key: str):
+        """ Yields the mutable state dict of key, changes are kept on exit. """
+        with self._lock:
+            state = self.states.setdefault(key, {})
+            yield state
+
+
+class FileBackend:
+    """
+        Bucket states shared by every process of a host through a json file,
+        read and rewritten under an exclusive flock of <path>.lock. POSIX
+        only, the state file is replaced atomically so a crash never leaves
+        it half written.
+    """
+    def __init__(self, path: str = DEFAULT_RATE_LIMIT_PATH):
+        if not HAS_FLOCK:
+            raise ImportError("FileBackend needs fcntl to share the budgets between processes.")
+        self.path = path
+
+    @contextmanager
+    def transaction(self, key: str):
+        with file_lock(self.path):
+            states = read_json(self.path, {})
+            state = states.setdefault(key, {})
+            before = dict(state)
+            yield state
+            if state != before:
+                # budgets are rebuilt from the next response headers, a
+                # crash losing the last write costs nothing worth an fsync
+                write_json(self.path, states, durable=False)
+
+
+class RedisBackend:
+    """
+        Bucket states shared across hosts. client only needs the get, set
+        and lock(name, timeout) calls of redis.Redis, so any stand-in
+        implementing them works too.
+    """
+    def __init__(self, client, prefix: str = 'tapi:rate_limit', lock_timeout: float = 10):
+        self.client = client
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+
+    @contextmanager
+    def transaction(self, key: str):
+        key = f'{self.prefix}:{key}'
+        with self.client.lock(f'{key}:lock', timeout=self.lock_timeout):
+            raw = self.client.get(key)
+            state = json.loads(raw) if raw else {}
+            before = dict(state)
+            yield state
+            if state != before:
+                self.client.set(key, json.dumps(state))
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def default_backend():
+    """
+        Backend of the limiters created without one: a FileBackend at
+        DEFAULT_RATE_LIMIT_PATH, so that every client of a host draws from
+        the same budgets, or a MemoryBackend where flock is not available.
+    """
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            try:
+                _default_backend = FileBackend()
+            except ImportError:
+                _default_backend = MemoryBackend()
+        return _default_backend
+
+
+def set_default_backend(backend) -> None:
+    """ Replaces the default backend in this process, MemoryBackend() opts out of sharing. """
+    global _default_backend
+    with _default_backend_lock:
+        _default_backend = backend
+
+
+class RateLimiter:
+    """
+        Collection of TokenBucket keyed by endpoint name, seeded from LIMITER.
+        Unknown endpoints are not throttled until the API reports their limit
+        through the response headers.
+
+        The bucket states live in backend, by default a FileBackend shared by
+        the processes of a host (see default_backend), RedisBackend to share
+        them between hosts and MemoryBackend to keep them per process.
+        namespace keeps the budgets of different apps and credentials apart
+        in a shared backend.
+
+            limiter = RateLimiter(backend=RedisBackend(redis.Redis()))
+            twitter = TwitterAPI(client_id, client_secret, limiter=limiter)
+    """
+    def __init__(
+        self, 
+        limits: dict = LIMITER, 
+        window: int = RATE_LIMIT_WINDOW, 
+        backend=None, 
+        namespace: str = 'default'
+    ):
+        self.window = window
+        self.limits = {name: spec['limit'] for name, spec in limits.items()}
+        self.backend = backend or default_backend()
+        self.namespace = namespace
+
+    @contextmanager
+    def bucket(self, name: str, limit: int = None):
+        """ Yields the TokenBucket of name, or None if it is not throttled, and stores it back. """
+        with self.backend.transaction(f'{self.namespace}:{name}') as state:
+            if state:
+                bucket = TokenBucket.load(state, self.window)
+            elif limit or name in self.limits:
+                bucket = TokenBucket(limit or self.limits[name], self.window)
+            else:
+                bucket = None
+            yield bucket
+            if bucket is not None:
+                state.update(bucket.dump())
+
+    def reserve(self, name: str) -> float:
+        with self.bucket(name) as bucket:
+            return bucket.reserve() if bucket else 0.0
+
+    def acquire(self, name: str) -> None:
+        wait = self.reserve(name)
+        if wait > 0:
+            time.sleep(wait)
+
+    def remaining(self, name: str) -> float:
+        """ Requests left in the current budget of name, inf when it is not throttled. """
+        with self.bucket(name) as bucket:
+            if bucket is None:
+                return math.inf
+            bucket._refill(time.time())
+            return bucket.tokens
+
+    def exhaust(self, name: str, reset: float = None) -> None:
+        """ Empties the budget of name until reset, one window from now by default. """
+        with self.bucket(name) as bucket:
+            if bucket is not None:
+                bucket.update(0, reset or time.time() + self.window)
+
+    def update(self, name: str, headers) -> None:
+        rate_limit = parse_rate_limit_headers(headers)
+        if not rate_limit:
+            return
+        remaining, reset, limit = rate_limit
+        with self.bucket(name, limit) as bucket:
+            if bucket is not None:
+                bucket.update(remaining, reset, limit)
+
+
+def parse_rate_limit_headers(headers):
+    try:
+        remaining = int(headers['x-rate-limit-remaining'])
+        reset = float(headers['x-rate-limit-reset'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    try:
+        limit = int(headers.get('x-rate-limit-limit'))
+    except (TypeError, ValueError):
+        limit = None
+    return remaining, reset, limit
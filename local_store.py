@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from constants import DEFAULT_LOCAL_STORE_PATH, DEFAULT_LOCAL_STORE_MAX_AGE
+
+KINDS = ('users', 'tweets')
+
+
+class LocalStore:
+    """
+        Deduplicated users and tweets keyed by id. Every record keeps the
+        time it was last fetched and the fields it was fetched with. Batched
+        id lookups (get_users, get_tweets) skip ids whose snapshot is younger
+        than max_age and holds every field they ask for. upsert replaces
+        older snapshots; a fresh snapshot with fields the new one lacks is
+        merged into instead, keeping its older fetched_at. Watermarks hold
+        the since_id of incremental syncs, cursors where an unfinished one
+        resumes.
+    """
+    def __init__(self, path: str = DEFAULT_LOCAL_STORE_PATH, max_age: float = DEFAULT_LOCAL_STORE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        for kind in KINDS:
+            self.conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {kind} ('
+                'id TEXT PRIMARY KEY, fetched_at REAL, data TEXT, fields TEXT)'
+            )
+            columns = [row[1] for row in self.conn.execute(f'PRAGMA table_info({kind})')]
+            if 'fields' not in columns:
+                self.conn.execute(f'ALTER TABLE {kind} ADD COLUMN fields TEXT')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS watermarks ('
+            'key TEXT PRIMARY KEY, since_id TEXT, updated_at REAL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS sync_cursors ('
+            'key TEXT PRIMARY KEY, until_id TEXT, head_id TEXT, updated_at REAL)'
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _table(kind: str) -> str:
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+        return kind
+
+    @staticmethod
+    def _fields(fields: Optional[Iterable[str]]) -> str:
+        return ','.join(sorted(set(fields or ())))
+
+    @staticmethod
+    def _covers(stored: Optional[str], requested: str) -> bool:
+        """ True if a snapshot fetched with the stored fields holds every requested one. """
+        return stored is not None and set(filter(None, requested.split(','))) <= set(stored.split(','))
+
+    def upsert(
+        self, 
+        kind: str, 
+        records: Iterable[dict], 
+        fetched_at: Optional[float] = None, 
+        fields: Optional[Iterable[str]] = None
+    ) -> int:
+        """ Stores records fetched with fields (the requested fields, None for the defaults). """
+        fetched_at = fetched_at or time.time()
+        fields = self._fields(fields)
+        records = {record['id']: record for record in records if record.get('id')}
+        rows = {id: (id, fetched_at, json.dumps(record), fields) for id, record in records.items()}
+        for id, (data, stored_at, stored_fields) in self._rows(kind, records).items():
+            if stored_at >= fetched_at - self.max_age and not self._covers(fields, stored_fields or ''):
+                rows[id] = (
+                    id, 
+                    stored_at, 
+                    json.dumps({**json.loads(data), **records[id]}), 
+                    self._fields({*fields.split(','), *stored_fields.split(',')} - {''})
+                )
+        rows = list(rows.values())
+        with self._lock:
+            self.conn.execute('BEGIN')
+            self.conn.executemany(
+                f'INSERT INTO {self._table(kind)} VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET '
+                'fetched_at = excluded.fetched_at, data = excluded.data, fields = excluded.fields '
+                'WHERE excluded.fetched_at >= fetched_at',
+                rows
+            )
+            self.conn.execute('COMMIT')
+        return len(rows)
+
+    def _rows(self, kind: str, ids: Iterable[str]) -> Dict[str, Tuple[str, float, Optional[str]]]:
+        """ {id: (data, fetched_at, fields)} of the stored ids. """
+        ids = list(ids)
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i+500]
+                rows = self.conn.execute(
+                    f'SELECT id, data, fetched_at, fields FROM {self._table(kind)} '
+                    f'WHERE id IN ({",".join("?"*len(chunk))})',
+                    chunk
+                ).fetchall()
+                for id, data, fetched_at, fields in rows:
+                    found[id] = (data, fetched_at, fields)
+        return found
+
+    def snapshots(
+        self, 
+        kind: str, 
+        ids: Iterable[str], 
+        max_age: Optional[float] = None, 
+        fields: Optional[Iterable[str]] = None
+    ) -> Dict[str, Tuple[dict, float]]:
+        """ Returns {id: (record, fetched_at)} for the stored ids younger than max_age holding fields. """
+        oldest = time.time() - max_age if max_age is not None else 0
+        return {
+            id: (json.loads(data), fetched_at) 
+            for id, (data, fetched_at, stored_fields) in self._rows(kind, ids).items()
+            if fetched_at >= oldest and self._covers(stored_fields, self._fields(fields))
+        }
+
+    def get(
+        self, 
+        kind: str, 
+        ids: Iterable[str], 
+        max_age: Optional[float] = None, 
+        fields: Optional[Iterable[str]] = None
+    ) -> Dict[str, dict]:
+        return {id: record for id, (record, _) in self.snapshots(kind, ids, max_age, fields).items()}
+
+    def all(self, kind: str) -> List[dict]:
+        with self._lock:
+            rows = self.conn.execute(f'SELECT data FROM {self._table(kind)}').fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def count(self, kind: str) -> int:
+        with self._lock:
+            return self.conn.execute(f'SELECT COUNT(*) FROM {self._table(kind)}').fetchone()[0]
+
+    def watermark(self, key: str) -> Optional[str]:
+        """ Highest tweet id already synced for key, see TwitterAPI.sync_user_mentions. """
+        with self._lock:
+            row = self.conn.execute('SELECT since_id FROM watermarks WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, key: str, since_id: str) -> None:
+        """ Moves the watermark of key forward, never backwards. """
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            row = self.conn.execute('SELECT since_id FROM watermarks WHERE key = ?', (key,)).fetchone()
+            if row is None or int(since_id) > int(row[0]):
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?)', 
+                    (key, since_id, time.time())
+                )
+            self.conn.execute('COMMIT')
+
+    def cursor(self, key: str) -> Optional[Tuple[str, str]]:
+        """ (until_id, head_id) of a sync of key that limit cut short, None if there is none. """
+        with self._lock:
+            row = self.conn.execute('SELECT until_id, head_id FROM sync_cursors WHERE key = ?', (key,)).fetchone()
+        return tuple(row) if row else None
+
+    def set_cursor(self, key: str, until_id: str, head_id: str) -> None:
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO sync_cursors VALUES (?, ?, ?, ?)', 
+                (key, until_id, head_id, time.time())
+            )
+
+    def clear_cursor(self, key: str) -> None:
+        with self._lock:
+            self.conn.execute('DELETE FROM sync_cursors WHERE key = ?', (key,))
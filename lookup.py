@@ -1,14 +1,26 @@
-from dataclasses import dataclass
-from typing import Any, Dict, Union, List
+import re
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Union, List, Tuple
 
 import constants
 from models.user import User
 from models.tweet import Tweet
+from models.decoders import decoder_for, decode_users, decode_tweets, expanded_fields
+from models.columns import UserColumns, TweetColumns
+from models.counts import TweetCounts
+from models.includes import Includes
+from storage import ResponseStore
+
+BATCH_FIELDS = {
+    'ids': 'id',
+    'usernames': 'username',
+}
+
 
 @dataclass
 class Lookup:
     endpoint: str
-    user_fields: list = None,
+    user_fields: list = None
     query: Dict[str, Any] = None
     expansions: list = None
     tweet_fields: list = None
@@ -40,67 +52,169 @@ class Lookup:
         url += '' if not self.media_fields else f"&media.fields={','.join(self.media_fields)}"
         url += '' if not self.poll_fields else f"&poll.fields={','.join(self.poll_fields)}"
         url += '' if not self.place_fields else f"&place.fields={','.join(self.place_fields)}"
-        url += '' if not self.count_fields else f"&place.fields={','.join(self.count_fields)}"
 
         if len(url) > constants.MAX_URL_LENGTH:
             raise ValueError(f"User Lookup has too many fields too long: {url}")
 
         return url
     
+    def split(self, key, max_items=constants.MAX_USERS_ID):
+        """
+            Packs query[key] greedily into as few lookups as possible, each
+            with at most max_items values and a url within MAX_URL_LENGTH.
+        """
+        values = [str(value) for value in self.query[key]]
+        base = len(replace(self, query={**self.query, key: []}).create_url())
+        batches, batch, length = [], [], base
+        for value in values:
+            extra = len(value) + (1 if batch else 0)
+            if batch and (len(batch) == max_items or length + extra > constants.MAX_URL_LENGTH):
+                batches.append(batch)
+                batch, length, extra = [], base, len(value)
+            batch.append(value)
+            length += extra
+        if batch:
+            batches.append(batch)
+        return [replace(self, query={**self.query, key: batch}) for batch in batches]
+
     @staticmethod
-    def next_page(url, response):
-        token = response.json()['meta'].get('next_token')
+    def next_page(url, response: dict):
+        token = response.get('meta', {}).get('next_token')
         if token:
-            next_page_url = url.replace("max_results", f"pagination_token={token}&max_results")
-            return next_page_url
+            return Lookup.page_url(url, token)
         return None
 
+    @staticmethod
+    def page_url(url, token):
+        return url.replace("max_results", f"pagination_token={token}&max_results")
+
+    @staticmethod
+    def sized_url(url, page_size):
+        return re.sub(r'max_results=\d+', f'max_results={page_size}', url)
+
+    @property
+    def page_size(self):
+        value = (self.query or {}).get('max_results')
+        if isinstance(value, list):
+            value = value[0] if value else None
+        return int(value) if value is not None else None
+
+    def sized(self, page_size):
+        return replace(self, query={**(self.query or {}), 'max_results': [str(page_size)]})
+
     @classmethod
     def paginate_responses(cls, responses):
         if responses and responses[0].get('data',False):
             data = responses[0]
             data_data = data['data']
-            data_includes = data.get('includes')
+            includes = Includes(data.get('includes'))
             for res in responses[1:]:
-                data_data.extend(res['data'])
-                if data_includes:
-                    for field in constants.IMPLEMENTED_MODELS:
-                        if data_includes.get(field, False):
-                            data_includes[field].extend(res['includes'][field])
+                data_data.extend(res.get('data', []))
+                includes.add(res.get('includes'))
+            if includes.to_dict():
+                data['includes'] = includes.to_dict()
             return data
         return {}
 
     @classmethod
-    def save_response(response):
-        raise NotImplementedError
+    def merge_batches(cls, responses, key, values):
+        """
+            Merges the responses of split lookups keeping the order of values,
+            not found errors of every batch are kept under 'errors'.
+        """
+        merged = cls.paginate_responses([res for res in responses if res.get('data')])
+        errors = [error for res in responses for error in res.get('errors', [])]
+        if errors:
+            merged['errors'] = errors
+        if merged.get('data'):
+            field = BATCH_FIELDS[key]
+            order = {str(value).lower(): i for i, value in enumerate(values)}
+            merged['data'].sort(key=lambda d: order.get(str(d.get(field)).lower(), len(order)))
+        return merged
+
+    kind = None
+    columns = None
+
+    @property
+    def fields(self) -> List[str]:
+        """ Top level fields of the records returned, as remembered by the LocalStore. """
+        requested = self.user_fields if self.kind == 'users' else self.tweet_fields
+        return sorted(set(requested or ()) | expanded_fields(self.expansions))
+
+    def save_response(self, response: dict, endpoint: str, store: ResponseStore):
+        """ Appends one response page to store under <kind>/<endpoint>. """
+        return store.write(self.kind, endpoint, response, self.columns)
+
+    def columnar(self, response: dict):
+        """ Builds the Columns container of the lookup straight from the response json. """
+        data = response.get('data') or []
+        return self.columns.from_records([data] if isinstance(data, dict) else data)
 
 
 @dataclass
 class UsersLookup(Lookup):
-    def save_response(response):
-        pass
+    kind = 'users'
+    columns = UserColumns
 
-    def datify(self, response: Union[dict, List[dict]]) -> Union[User, List[User]]:
+    def datify(self, response: Union[dict, List[dict]], includes: Includes = None) -> Union[User, List[User]]:
         if response.get('data'):
             data = response['data']
             if isinstance(data, dict):
-                return User.from_dict(data)
-            users = []
-            for user_data in response['data']:
-                users.append(User.from_dict(user_data))
-            return users
+                return decoder_for(User, self.user_fields, self.expansions)(data)
+            return decode_users(data, self.user_fields, self.expansions)
+@dataclass
+class ListsLookup(UsersLookup):
+    """ List objects of the list endpoints, decoded like users but never stored as such. """
+    kind = 'lists'
+
+
 @dataclass
 class TweetLookup(Lookup):
-    def save_response(response):
-        pass
+    kind = 'tweets'
+    columns = TweetColumns
 
-    def datify(self, response: Union[dict, List[dict]]) -> Union[Tweet, List[Tweet]]:
+    def datify(self, response: Union[dict, List[dict]], includes: Includes = None) -> Union[Tweet, List[Tweet]]:
+        """
+            Tweets are linked to their expansions. Pass the same includes
+            for every page of a stream to share them across pages.
+        """
         if response.get('data'):
             data = response['data']
+            if includes is None:
+                includes = Includes(response.get('includes'))
+            else:
+                includes.add(response.get('includes'))
             if isinstance(data, dict):
-                return Tweet.from_dict(data)
-            tweets = []
-            for tweets_data in data:
-                tweets.append(Tweet.from_dict(tweets_data))
-            return tweets
+                return includes.resolve(decoder_for(Tweet, self.tweet_fields, self.expansions)(data))
+            return includes.resolve_all(decode_tweets(data, self.tweet_fields, self.expansions))
+
+
+@dataclass
+class UsernamesLookup(UsersLookup):
+    def datify(self, response: dict, includes: Includes = None) -> Tuple[List[User], List[str]]:
+        """ Returns the found users and, separately, the usernames that were not. """
+        users = super().datify(response) or []
+        found = {user.username.lower() for user in users if user.username}
+        unknown = [
+            username for username in self.query['usernames'] 
+            if username.lower() not in found
+        ]
+        return users, unknown
+
+
+@dataclass
+class CountsLookup(Lookup):
+    kind = 'counts'
+
+    @property
+    def granularity(self) -> str:
+        return self.query.get('granularity', 'hour')
+
+    def datify(self, response: dict) -> TweetCounts:
+        return TweetCounts.from_response(response, self.granularity, self.query.get('query'))
+
+    def columnar(self, response: dict) -> TweetCounts:
+        return self.datify(response)
 
+    def save_response(self, response: dict, endpoint: str, store: ResponseStore):
+        return store.write(self.kind, endpoint, response, TweetCounts)
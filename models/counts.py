@@ -0,0 +1,146 @@
+"""
+    Tweet count series returned by the counts endpoints. Bucket start times
+    are kept as epoch milliseconds and counts as int64, both in typed arrays,
+    so a series costs 16 bytes per bucket and converts to numpy/pyarrow
+    without copying.
+"""
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+GRANULARITY_MS = {
+    'minute': 60*1000,
+    'hour': 60*60*1000,
+    'day': 24*60*60*1000,
+}
+
+
+def to_epoch_ms(timestamp: str) -> int:
+    """ '2022-05-30T00:00:00.000Z' -> epoch milliseconds. """
+    moment = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp()*1000)
+
+
+def to_timestamp(epoch_ms: int) -> str:
+    moment = datetime.fromtimestamp(epoch_ms/1000, tz=timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f'{epoch_ms % 1000:03d}Z'
+
+
+class TweetCounts:
+    """
+        starts holds the bucket start times, counts the tweets per bucket,
+        total the meta.total_tweet_count of the response (or the sum of
+        the buckets when it was not returned).
+    """
+    def __init__(
+        self,
+        granularity: str = 'hour',
+        query: Optional[str] = None,
+        starts: Optional[Iterable[int]] = None,
+        counts: Optional[Iterable[int]] = None,
+        total: Optional[int] = None,
+    ):
+        if granularity not in GRANULARITY_MS:
+            raise ValueError(f"granularity must be one of {tuple(GRANULARITY_MS)}")
+        self.granularity = granularity
+        self.query = query
+        self.starts = array('q', starts or ())
+        self.counts = array('q', counts or ())
+        self._total = total
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], granularity: str = 'hour', query: Optional[str] = None):
+        counts = cls(granularity, query)
+        counts.extend(records)
+        return counts
+
+    @classmethod
+    def from_response(cls, response: dict, granularity: str = 'hour', query: Optional[str] = None):
+        counts = cls.from_records(response.get('data') or [], granularity, query)
+        counts._total = (response.get('meta') or {}).get('total_tweet_count')
+        return counts
+
+    def extend(self, records: Iterable[dict]) -> None:
+        for record in records:
+            self.starts.append(to_epoch_ms(record['start']))
+            self.counts.append(record['tweet_count'])
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts) if self._total is None else self._total
+
+    @property
+    def bucket_ms(self) -> int:
+        return GRANULARITY_MS[self.granularity]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        return ((to_timestamp(start), count) for start, count in zip(self.starts, self.counts))
+
+    def __repr__(self) -> str:
+        return f"TweetCounts(query={self.query!r}, granularity={self.granularity!r}, buckets={len(self)}, total={self.total})"
+
+    def to_records(self) -> List[dict]:
+        """ Back to the {start, end, tweet_count} records of the api. """
+        return [
+            {'start': to_timestamp(start), 'end': to_timestamp(start + self.bucket_ms), 'tweet_count': count}
+            for start, count in zip(self.starts, self.counts)
+        ]
+
+    def resample(self, granularity: str) -> 'TweetCounts':
+        """ Sums the buckets into coarser ones, minute -> hour -> day (UTC). """
+        if granularity not in GRANULARITY_MS:
+            raise ValueError(f"granularity must be one of {tuple(GRANULARITY_MS)}")
+        step = GRANULARITY_MS[granularity]
+        if step < self.bucket_ms:
+            raise ValueError(f"Cannot resample {self.granularity} counts to {granularity}")
+        resampled = TweetCounts(granularity, self.query, total=self._total)
+        starts, counts = resampled.starts, resampled.counts
+        for start, count in zip(self.starts, self.counts):
+            start -= start % step
+            if starts and starts[-1] == start:
+                counts[-1] += count
+            else:
+                starts.append(start)
+                counts.append(count)
+        return resampled
+
+    def to_numpy(self) -> Dict:
+        """ start as datetime64[ms] and tweet_count as int64, sharing the arrays' memory. """
+        import numpy as np
+
+        return {
+            'start': np.frombuffer(self.starts, dtype=np.int64).view('datetime64[ms]'),
+            'tweet_count': np.frombuffer(self.counts, dtype=np.int64),
+        }
+
+    def to_arrow(self):
+        import pyarrow as pa
+
+        batch = self.to_numpy()
+        return pa.RecordBatch.from_pydict({
+            'start': pa.array(batch['start'], pa.timestamp('ms', tz='UTC')),
+            'tweet_count': pa.array(batch['tweet_count']),
+        })
+
+
+def stack(series: Dict[str, TweetCounts]):
+    """
+        Aligns several series on the union of their bucket starts. Returns
+        (starts, matrix) where starts is datetime64[ms] and matrix an int64
+        array with one row per series, in the order of series.
+    """
+    import numpy as np
+
+    starts = np.unique(np.concatenate([
+        np.frombuffer(counts.starts, dtype=np.int64) for counts in series.values()
+    ] or [np.empty(0, dtype=np.int64)]))
+    matrix = np.zeros((len(series), len(starts)), dtype=np.int64)
+    for row, counts in enumerate(series.values()):
+        columns = np.searchsorted(starts, np.frombuffer(counts.starts, dtype=np.int64))
+        np.add.at(matrix[row], columns, np.frombuffer(counts.counts, dtype=np.int64))
+    return starts.view('datetime64[ms]'), matrix
@@ -0,0 +1,137 @@
+"""
+    Schema specialised decoders for the models. Each decoder is generated
+    once per dataclass (and per set of requested fields) as plain python
+    source, so decoding a response is a handful of dict lookups and
+    constructor calls instead of a generic walk over the type hints. A
+    record and every object nested in it are built by a single expression
+    with positional arguments, no call per nested object.
+
+    Fields flagged with metadata INTERN are passed through sys.intern so
+    repeated values such as lang or source share one string. RESOLVED
+    fields are filled in from the includes afterwards, see models.includes.
+"""
+import sys
+from dataclasses import fields, is_dataclass, MISSING
+from functools import lru_cache
+from typing import get_type_hints, get_origin, get_args, Union, List, Optional, Iterable
+
+from models.user import User
+from models.tweet import Tweet
+
+MAX_INLINE_DEPTH = 4
+
+ALWAYS_RETURNED_FIELDS = {
+    User: {'id', 'name', 'username'},
+    Tweet: {'id', 'text'},
+}
+
+
+def _unwrap(hint):
+    """ Returns (model, is_list) for Optional[Model] / Optional[List[Model]] hints. """
+    if get_origin(hint) is Union:
+        args = [arg for arg in get_args(hint) if arg is not type(None)]
+        hint = args[0] if len(args) == 1 else hint
+    if get_origin(hint) in (list, List):
+        (item,) = get_args(hint) or (None,)
+        return (item if is_dataclass(item) else None), True
+    return (hint if is_dataclass(hint) else None), False
+
+
+def _build(cls, src: str, depth: int, namespace: dict, selected: Optional[frozenset] = None) -> str:
+    """
+        Source of an expression building cls from the dict named src. The
+        arguments are positional, in field order, and nested models are
+        built inline down to MAX_INLINE_DEPTH, so one call decodes a whole
+        record instead of one per nested object.
+    """
+    hints = get_type_hints(cls)
+    v = f'v{depth}'
+    args = []
+    for f in fields(cls):
+        if not f.init:
+            continue
+        default = 'None'
+        if f.default_factory is not MISSING:
+            namespace[f'{cls.__name__}_{f.name}_factory'] = f.default_factory
+            default = f'{cls.__name__}_{f.name}_factory()'
+        elif f.default is not MISSING and f.default is not None:
+            namespace[f'{cls.__name__}_{f.name}_default'] = f.default
+            default = f'{cls.__name__}_{f.name}_default'
+        has_default = f.default is not MISSING or f.default_factory is not MISSING
+        if f.metadata.get('resolved') or (selected is not None and f.name not in selected and has_default):
+            args.append(default)
+            continue
+
+        model, is_list = _unwrap(hints[f.name])
+        get = f'{src}.get({f.name!r})'
+        if model is None and f.metadata.get('intern'):
+            value = f"(intern({v}) if ({v} := {get}) is not None else {default})"
+        elif model is None:
+            value = get if default == 'None' else f'{src}.get({f.name!r}, {default})'
+        else:
+            if depth < MAX_INLINE_DEPTH:
+                x = f'x{depth}'
+                item = _build(model, x if is_list else v, depth + 1, namespace)
+            else:
+                namespace[f'decode_{model.__name__}'] = compile_decoder(model)
+                x, item = 'x', f'decode_{model.__name__}(x)'
+                item = item if is_list else f'decode_{model.__name__}({v})'
+            item = f'[{item} for {x} in {v}]' if is_list else item
+            value = f"({item} if ({v} := {get}) is not None else {default})"
+        args.append(value)
+
+    # trailing defaults are left to the constructor
+    while args and args[-1] == 'None':
+        args.pop()
+    namespace[cls.__name__] = cls
+    return f"{cls.__name__}({', '.join(args)})"
+
+
+@lru_cache(maxsize=None)
+def compile_decoder(cls, selected: Optional[frozenset] = None):
+    """
+        Builds decoder(d) -> cls. When selected is given only those fields
+        are read from d, the rest keep their dataclass default. decoder_for
+        selects the requested fields plus the ones expansions bring along.
+    """
+    namespace = {'intern': sys.intern}
+    source = (
+        f"def decode_{cls.__name__}(d):\n"
+        f"    return {_build(cls, 'd', 0, namespace, selected)}\n"
+    )
+    exec(compile(source, f'<decoder {cls.__name__}>', 'exec'), namespace)
+    return namespace[f'decode_{cls.__name__}']
+
+
+def expanded_fields(expansions: Optional[Iterable[str]]) -> set:
+    """ Fields the api returns for expansions whether requested or not, 'attachments.media_keys' -> attachments. """
+    return {expansion.split('.')[0] for expansion in expansions or ()}
+
+
+def decoder_for(
+    cls, 
+    requested_fields: Optional[Iterable[str]] = None, 
+    expansions: Optional[Iterable[str]] = None
+):
+    if requested_fields is None:
+        return compile_decoder(cls)
+    selected = frozenset(requested_fields) | ALWAYS_RETURNED_FIELDS.get(cls, set()) | expanded_fields(expansions)
+    return compile_decoder(cls, selected)
+
+
+def decode_users(
+    data: List[dict], 
+    user_fields: Optional[Iterable[str]] = None, 
+    expansions: Optional[Iterable[str]] = None
+) -> List[User]:
+    decode = decoder_for(User, user_fields, expansions)
+    return [decode(d) for d in data]
+
+
+def decode_tweets(
+    data: List[dict], 
+    tweet_fields: Optional[Iterable[str]] = None, 
+    expansions: Optional[Iterable[str]] = None
+) -> List[Tweet]:
+    decode = decoder_for(Tweet, tweet_fields, expansions)
+    return [decode(d) for d in data]
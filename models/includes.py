@@ -0,0 +1,112 @@
+"""
+    Hash indexes over the includes of the responses. Every expanded object
+    is stored once under its id (media under media_key), whichever page it
+    came in, and decoded the first time a tweet points at it, so repeated
+    authors across pages share a single User.
+
+    With max_entries the index keeps, per kind, only the entries used most
+    recently, plus every entry of the last page added. An author evicted
+    and seen again is decoded again, into a new User.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from models.user import User
+from models.tweet import Tweet
+from models.media import Media
+from models.place import Place
+from models.poll import Poll
+from models.decoders import compile_decoder
+
+INCLUDES_KEYS = {
+    'users': 'id',
+    'tweets': 'id',
+    'media': 'media_key',
+    'places': 'id',
+    'polls': 'id',
+}
+
+INCLUDES_MODELS = {
+    'users': User,
+    'tweets': Tweet,
+    'media': Media,
+    'places': Place,
+    'polls': Poll,
+}
+
+
+class Includes:
+    def __init__(self, includes: Optional[dict] = None, max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self.records: Dict[str, Dict[str, dict]] = {kind: OrderedDict() for kind in INCLUDES_KEYS}
+        self.objects: Dict[str, Dict[str, object]] = {kind: {} for kind in INCLUDES_KEYS}
+        if includes:
+            self.add(includes)
+
+    def add(self, includes: Optional[dict]) -> None:
+        """ Indexes the includes of one more page, known ids keep their first record. """
+        for kind, records in (includes or {}).items():
+            key = INCLUDES_KEYS.get(kind)
+            if key is None:
+                continue
+            index = self.records[kind]
+            added = 0
+            for record in records:
+                if record.get(key) is not None:
+                    index.setdefault(record[key], record)
+                    index.move_to_end(record[key])
+                    added += 1
+            if self.max_entries is not None:
+                self._evict(kind, len(index) - max(self.max_entries, added))
+
+    def _evict(self, kind: str, n: int) -> None:
+        """ Drops the n entries of kind used least recently, the ones of the last page are at the end. """
+        index, objects = self.records[kind], self.objects[kind]
+        for _ in range(n):
+            id, _ = index.popitem(last=False)
+            objects.pop(id, None)
+
+    def to_dict(self) -> dict:
+        """ The merged includes of every page, in the shape of the api. """
+        return {kind: list(records.values()) for kind, records in self.records.items() if records}
+
+    def get(self, kind: str, id: Optional[str]):
+        """ The decoded object of kind with id, None if it was not included. """
+        objects = self.objects[kind]
+        obj = objects.get(id)
+        if obj is None:
+            record = self.records[kind].get(id)
+            if record is None:
+                return None
+            obj = objects[id] = compile_decoder(INCLUDES_MODELS[kind])(record)
+            if kind == 'tweets':
+                self.resolve(obj, referenced=False)
+        if self.max_entries is not None:
+            self.records[kind].move_to_end(id)
+        return obj
+
+    def _all(self, kind: str, ids: Optional[Iterable[str]]) -> Optional[List]:
+        if not ids:
+            return None
+        found = [self.get(kind, id) for id in ids]
+        return [obj for obj in found if obj is not None] or None
+
+    def resolve(self, tweet: Tweet, referenced: bool = True) -> Tweet:
+        """
+            Links author, attachments media/polls, geo place and, unless
+            referenced is False, the referenced tweets of tweet in place.
+        """
+        if tweet.author_id is not None:
+            tweet.author = self.get('users', tweet.author_id)
+        if tweet.attachments is not None:
+            tweet.attachments.media = self._all('media', tweet.attachments.media_keys)
+            tweet.attachments.polls = self._all('polls', tweet.attachments.poll_ids)
+        if tweet.geo is not None and tweet.geo.place_id is not None:
+            tweet.geo.place = self.get('places', tweet.geo.place_id)
+        if referenced and tweet.referenced_tweets:
+            for reference in tweet.referenced_tweets:
+                reference.tweet = self.get('tweets', reference.id)
+        return tweet
+
+    def resolve_all(self, tweets: Iterable[Tweet]) -> List[Tweet]:
+        return [self.resolve(tweet) for tweet in tweets]
@@ -0,0 +1,31 @@
+from __future__ import annotations 
+
+from dataclasses import dataclass, field
+from typing import Optional, List
+
+from dataclass_wizard import JSONWizard
+
+@dataclass(slots=True)
+class MediaPublicMetrics:
+    view_count: Optional[int] = field(default=None, repr=True)
+
+
+@dataclass(slots=True)
+class MediaVariant:
+    bit_rate: Optional[int] = field(default=None, repr=True)
+    content_type: Optional[str] = field(default=None, repr=True)
+    url: Optional[str] = field(default=None, repr=True)
+
+
+@dataclass(slots=True)
+class Media(JSONWizard):
+    media_key: Optional[str] = field(default=None, repr=True)
+    type: Optional[str] = field(default=None, repr=True)
+    url: Optional[str] = field(default=None, repr=True)
+    duration_ms: Optional[int] = field(default=None, repr=True)
+    height: Optional[int] = field(default=None, repr=True)
+    width: Optional[int] = field(default=None, repr=True)
+    preview_image_url: Optional[str] = field(default=None, repr=True)
+    alt_text: Optional[str] = field(default=None, repr=True)
+    public_metrics: Optional[MediaPublicMetrics] = field(default=None, repr=True)
+    variants: Optional[List[MediaVariant]] = field(default=None, repr=True)
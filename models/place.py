@@ -0,0 +1,24 @@
+from __future__ import annotations 
+
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+
+from dataclass_wizard import JSONWizard
+
+@dataclass(slots=True)
+class PlaceGeo:
+    type: Optional[str] = field(default=None, repr=True)
+    bbox: Optional[List[float]] = field(default=None, repr=True)
+    properties: Optional[Dict[str, Any]] = field(default=None, repr=True)
+
+
+@dataclass(slots=True)
+class Place(JSONWizard):
+    id: Optional[str] = field(default=None, repr=True)
+    full_name: Optional[str] = field(default=None, repr=True)
+    name: Optional[str] = field(default=None, repr=True)
+    country: Optional[str] = field(default=None, repr=True)
+    country_code: Optional[str] = field(default=None, repr=True)
+    place_type: Optional[str] = field(default=None, repr=True)
+    contained_within: Optional[List[str]] = field(default=None, repr=True)
+    geo: Optional[PlaceGeo] = field(default=None, repr=True)
@@ -0,0 +1,21 @@
+from __future__ import annotations 
+
+from dataclasses import dataclass, field
+from typing import Optional, List
+
+from dataclass_wizard import JSONWizard
+
+@dataclass(slots=True)
+class PollOption:
+    position: Optional[int] = field(default=None, repr=True)
+    label: Optional[str] = field(default=None, repr=True)
+    votes: Optional[int] = field(default=None, repr=True)
+
+
+@dataclass(slots=True)
+class Poll(JSONWizard):
+    id: Optional[str] = field(default=None, repr=True)
+    options: Optional[List[PollOption]] = field(default=None, repr=True)
+    duration_minutes: Optional[int] = field(default=None, repr=True)
+    end_datetime: Optional[str] = field(default=None, repr=True)
+    voting_status: Optional[str] = field(default=None, repr=True)
@@ -6,49 +6,61 @@ from typing import Optional, List
 
 from dataclass_wizard import JSONWizard
 
-@dataclass
+from models.user import User
+from models.media import Media
+from models.place import Place
+from models.poll import Poll
+
+# Low cardinality strings, decoders keep a single copy of each value.
+INTERN = {'intern': True}
+# Objects linked from the response includes (models.includes), not decoded.
+RESOLVED = {'resolved': True}
+
+@dataclass(slots=True)
 class TweetAttachments:
     poll_ids: Optional[List[str]] = field(default=None, repr=True, compare=False)
     media_keys: Optional[List[str]] = field(default=None, repr=True, compare=False)
+    media: Optional[List[Media]] = field(default=None, repr=False, compare=False, metadata=RESOLVED)
+    polls: Optional[List[Poll]] = field(default=None, repr=False, compare=False, metadata=RESOLVED)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetContextAnnotationsDomain:
     id: Optional[str] = field(default=None, repr=True)
     name: Optional[str] = field(default=None, repr=True)
     description: Optional[str] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetContextAnnotationsEntity:
     id: Optional[str] = field(default=None, repr=True)
     name: Optional[str] = field(default=None, repr=True)
     description: Optional[str] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetContextAnnotations:
     domain: Optional[TweetContextAnnotationsDomain] = field(default=None, repr=True)
     entity: Optional[TweetContextAnnotationsEntity] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetEntitiesAnnotations:
     start: Optional[int] = field(default=None, repr=True)
     end: Optional[int] = field(default=None, repr=True)
     probability: Optional[float] = field(default=None, repr=True)
-    type: Optional[str] = field(default=None, repr=True)
+    type: Optional[str] = field(default=None, repr=True, metadata=INTERN)
     normalized_text: Optional[str] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetEntitiesTag:
     start: Optional[int] = field(default=None, repr=True)
     end: Optional[int] = field(default=None, repr=True)
     tag: Optional[str] = field(default=None, repr=True)
     
 
-@dataclass
+@dataclass(slots=True)
 class TweetEntitiesUrl:
     start: Optional[int] = field(default=None, repr=True)
     end: Optional[int] = field(default=None, repr=True)
@@ -61,7 +73,7 @@ class TweetEntitiesUrl:
     unknown_url: Optional[str] = field(default=None, repr=True)
 
     
-@dataclass
+@dataclass(slots=True)
 class TweetEntities:
     annotations: Optional[List[TweetEntitiesAnnotations]]
     cashtags: Optional[List[TweetEntitiesTag]]
@@ -70,26 +82,27 @@ class TweetEntities:
     urls: Optional[List[TweetEntitiesUrl]]
 
 
-@dataclass
+@dataclass(slots=True)
 class Coordinates:
-    type: Optional[str] = field(default=None, repr=True)
+    type: Optional[str] = field(default=None, repr=True, metadata=INTERN)
     coordinates: Optional[List[float]] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetGeo:
     coordinates: Optional[Coordinates] = field(default=None, repr=True)
     place_id: Optional[str] = field(default=None, repr=True)
+    place: Optional[Place] = field(default=None, repr=False, compare=False, metadata=RESOLVED)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetNonPublicMetrics:
     impression_count: Optional[int] = field(default=None, repr=True)
     url_link_clicks: Optional[int] = field(default=None, repr=True)
     user_profile_clicks: Optional[int] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetMainMetrics:
     impression_count: Optional[int] = field(default=None, repr=True)
     like_count: Optional[int] = field(default=None, repr=True)
@@ -99,7 +112,7 @@ class TweetMainMetrics:
     user_profile_clicks: Optional[int] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetPublicMetrics:
     retweet_count: Optional[int] = field(default=None, repr=True)
     reply_count: Optional[int] = field(default=None, repr=True)
@@ -107,19 +120,20 @@ class TweetPublicMetrics:
     quote_count: Optional[int] = field(default=None, repr=True)
     
 
-@dataclass
+@dataclass(slots=True)
 class TweetReferencedTweets:
-    type: Optional[str] = field(default=None, repr=True)
+    type: Optional[str] = field(default=None, repr=True, metadata=INTERN)
     id: Optional[str] = field(default=None, repr=True)
+    tweet: Optional[Tweet] = field(default=None, repr=False, compare=False, metadata=RESOLVED)
 
 
-@dataclass
+@dataclass(slots=True)
 class TweetWithheld:
     copyright: Optional[str] = field(default=None, repr=True)
     country_codes: Optional[List[str]] = field(default=None, repr=True)
 
 
-@dataclass 
+@dataclass(slots=True)
 class Tweet(JSONWizard):
     id: Optional[str] = field(default=None, repr=True)
     text: Optional[str] = field(default=None, repr=True)
@@ -131,14 +145,15 @@ class Tweet(JSONWizard):
     entities: Optional[TweetEntities] = field(default=None, repr=True)
     geo: Optional[TweetGeo] = field(default=None, repr=True)
     in_reply_to_user_id: Optional[str] = field(default=None, repr=True) 
-    lang: Optional[str] = field(default=None, repr=True)
+    lang: Optional[str] = field(default=None, repr=True, metadata=INTERN)
     non_public_metrics: Optional[TweetNonPublicMetrics] = field(default=None, repr=True)
     organic_metrics: Optional[TweetMainMetrics] = field(default=None, repr=True)
     possibly_sensitive: Optional[bool] = field(default=None, repr=True)
     promoted_metrics: Optional[TweetMainMetrics] = field(default=None, repr=True)
     public_metrics: Optional[TweetPublicMetrics] = field(default=None, repr=True)
     referenced_tweets: Optional[List[TweetReferencedTweets]] = field(default=None, repr=True)
-    reply_settings: Optional[str] = field(default=None, repr=True)
-    source: Optional[str] = field(default=None, repr=True)
+    reply_settings: Optional[str] = field(default=None, repr=True, metadata=INTERN)
+    source: Optional[str] = field(default=None, repr=True, metadata=INTERN)
     withheld: Optional[TweetWithheld] = field(default=None, repr=True)
+    author: Optional[User] = field(default=None, repr=False, compare=False, metadata=RESOLVED)
 
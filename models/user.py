@@ -6,7 +6,7 @@ from typing import Optional, List
 
 from dataclass_wizard import JSONWizard
 
-@dataclass
+@dataclass(slots=True)
 class UserEntitiesUrlObj:
     start: Optional[int] = field(default=None, repr=True)
     end: Optional[int] = field(default=None, repr=True)
@@ -15,12 +15,12 @@ class UserEntitiesUrlObj:
     display_url: Optional[str] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class UserEntitiesUrl:
     urls: Optional[List[UserEntitiesUrlObj]] = field(default=None)
 
 
-@dataclass
+@dataclass(slots=True)
 class UserEntitiesTag:
     start: Optional[int] = field(default=None, repr=True)
     end: Optional[int] = field(default=None, repr=True)
@@ -28,7 +28,7 @@ class UserEntitiesTag:
 
 
 
-@dataclass
+@dataclass(slots=True)
 class UserEntitiesDescription:
     urls: Optional[List[UserEntitiesUrlObj]] = field(default=None, repr=True)
     hashtags: Optional[List[UserEntitiesTag]] = field(default=None, repr=True)
@@ -36,13 +36,13 @@ class UserEntitiesDescription:
     cashtags: Optional[List[UserEntitiesTag]] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class UserEntities:
     url: Optional[UserEntitiesUrl] = field(default=None)
     description: Optional[UserEntitiesDescription] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class UserPublicMetrics:
     followers_count: Optional[int] = field(default=None, repr=True)
     following_count: Optional[int] = field(default=None, repr=True)
@@ -50,13 +50,13 @@ class UserPublicMetrics:
     listed_count: Optional[int] = field(default=None, repr=True)
      
 
-@dataclass
+@dataclass(slots=True)
 class UserWithheld:
     scope: Optional[str] = field(default=None)
     country_codes: Optional[List[str]] = field(default=None, repr=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class User(JSONWizard):
     id: Optional[str] = field(default=None, repr=True)
     name: Optional[str] = field(default=None, repr=True)
@@ -0,0 +1,111 @@
+"""
+    Pipelined pagination: pages are fetched on one worker thread, decoded on
+    another and handed to the caller, with a bounded queue between stages so
+    at most depth pages wait at each one. Fetching goes through the client's
+    limiter like any other request, so running ahead never exceeds the rate
+    budget, and closing the consumer stops both workers.
+
+        fetch -> queue(depth) -> decode -> queue(depth) -> caller
+"""
+import queue
+import asyncio
+import threading
+from contextlib import closing
+
+_ITEM, _ERROR, _END = range(3)
+
+
+def prefetched(iterable, depth):
+    """
+        Iterates iterable on a worker thread that stays up to depth items
+        ahead of the consumer. Errors are raised on the consumer side.
+    """
+    items = queue.Queue(maxsize=max(depth, 1))
+    stopped = threading.Event()
+
+    def offer(kind, value=None):
+        while not stopped.is_set():
+            try:
+                items.put((kind, value), timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not offer(_ITEM, item):
+                    return
+            offer(_END)
+        except BaseException as e:
+            offer(_ERROR, e)
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            kind, value = items.get()
+            if kind == _END:
+                return
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        stopped.set()
+
+
+def decoded(decode, pages):
+    with closing(pages):
+        for page in pages:
+            yield decode(page)
+
+
+def pipelined(pages, decode, depth):
+    """ decode(page) for every page of pages, fetched and decoded off the caller's thread. """
+    return prefetched(decoded(decode, prefetched(pages, depth)), depth)
+
+
+async def async_prefetched(aiterable, depth):
+    """ Coroutine counterpart of prefetched, the worker is a task on the running loop. """
+    items = asyncio.Queue(maxsize=max(depth, 1))
+
+    async def produce():
+        try:
+            async for item in aiterable:
+                await items.put((_ITEM, item))
+            await items.put((_END, None))
+        except asyncio.CancelledError:
+            raise
+        except BaseException as e:
+            await items.put((_ERROR, e))
+        finally:
+            await aiterable.aclose()
+
+    worker = asyncio.ensure_future(produce())
+    try:
+        while True:
+            kind, value = await items.get()
+            if kind == _END:
+                return
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        worker.cancel()
+
+
+async def async_decoded(decode, pages):
+    try:
+        async for page in pages:
+            yield await asyncio.to_thread(decode, page)
+    finally:
+        await pages.aclose()
+
+
+def async_pipelined(pages, decode, depth):
+    return async_prefetched(async_decoded(decode, async_prefetched(pages, depth)), depth)
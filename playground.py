@@ -1,9 +1,6 @@
 import os
-import time
-import json
 from tkinter.tix import Tree
 from typing import List, Union, Dict
-from dataclasses import asdict
 from datetime import datetime, timedelta
 
 from dotenv import load_dotenv
@@ -38,32 +35,20 @@ def fetch_and_save_all_followers(user_id: str, twitter=twitter):
             user_id,
             max_results=user_followers_count,
             user_fields=ALL_USER_FIELDS,
+            save=True,
         )
-        with open(f'data/users/user_{user_id}_followers_{time.time()}.json', 'w') as file:
-            json.dump(
-                [asdict(uf) for uf in user_followers], 
-                file, 
-                skipkeys=True,
-                indent=3
-            )
     except Exception as e:
         print(f"Failed to fetch all followers: {e}")
 
     return user_followers  
 
 def fetch_all_hagovs(twitter=twitter):
-    hagovs = twitter.get_list_members(
+    return twitter.get_list_members(
         '1537128547470417925',
         max_results=1000,
         user_fields=ALL_USER_FIELDS,
+        save=True,
     )
-    with open(f'data/users/hagovs.json', 'w') as file:
-        json.dump(
-            [asdict(hagov) for hagov in hagovs],
-            file,
-            skipkeys=True,
-            indent=3
-        )
 
 def fetch_user_recent_tweets(username: str, twitter=twitter, days_back=7):
     user = twitter.get_users_by_username_regex(username)
@@ -0,0 +1,40 @@
+import time
+import random
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from constants import RATE_LIMIT_WINDOW
+
+
+@dataclass
+class RetryPolicy:
+    """
+        429 responses wait until x-rate-limit-reset, 5xx responses and
+        connection errors back off exponentially with full jitter. Non
+        idempotent requests (POST) are only retried on 429.
+    """
+    max_retries: int = 5
+    backoff_base: float = 1.0
+    backoff_max: float = 60.0
+    max_rate_limit_wait: float = RATE_LIMIT_WINDOW + 60
+    retry_statuses: Tuple[int, ...] = (500, 502, 503, 504)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def rate_limit_wait(self, headers, attempt: int) -> float:
+        try:
+            reset = float(headers['x-rate-limit-reset'])
+        except (KeyError, TypeError, ValueError):
+            return self.backoff(attempt)
+        return min(self.max_rate_limit_wait, max(0.0, reset - time.time()) + 1)
+
+    def delay(self, response, attempt: int, idempotent: bool = True) -> Optional[float]:
+        """ Seconds to wait before retrying response, None if it is final. """
+        if attempt >= self.max_retries:
+            return None
+        if response.status_code == 429:
+            return self.rate_limit_wait(response.headers, attempt)
+        if idempotent and response.status_code in self.retry_statuses:
+            return self.backoff(attempt)
+        return None
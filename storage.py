@@ -0,0 +1,119 @@
+import os
+import json
+import gzip
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from constants import DEFAULT_DATA_DIR, DEFAULT_SEGMENT_BYTES
+from json_backend import loads
+
+FORMATS = ('jsonl', 'parquet')
+COMPRESSIONS = (None, 'gzip', 'zstd')
+
+
+class ResponseStore:
+    """
+        Append only persistence for save=True, one directory per endpoint:
+
+            <root>/<users|tweets>/<endpoint>/<YYYY-MM-DD>/<segment>
+
+        jsonl segments hold one response page per line and are rotated once
+        they grow past segment_bytes. With compression every page is its own
+        gzip member / zstd frame, so segments stay appendable and readable
+        with the standard tools. parquet segments hold the flat columnar
+        batch of each page (see models.columns), compressed natively.
+    """
+    def __init__(
+        self,
+        root: str = DEFAULT_DATA_DIR,
+        format: str = 'jsonl',
+        compression: Optional[str] = None,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {COMPRESSIONS}")
+        self.root = root
+        self.format = format
+        self.compression = compression
+        self.segment_bytes = segment_bytes
+        self.segments = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._compressor = None
+        if compression == 'zstd' and format == 'jsonl':
+            import zstandard
+            self._compressor = zstandard.ZstdCompressor()
+
+    def directory(self, kind: str, endpoint: str) -> str:
+        day = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        path = os.path.join(self.root, kind, endpoint, day)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _segment_name(self, extension: str) -> str:
+        self._seq += 1
+        return f'{int(time.time()*1000)}-{os.getpid()}-{self._seq:06d}.{extension}'
+
+    def write(self, kind: str, endpoint: str, response: dict, columns=None) -> Optional[str]:
+        """ Persists one response page, returns the segment it was written to. """
+        if not response or not response.get('data'):
+            return None
+        with self._lock:
+            if self.format == 'parquet':
+                return self._write_parquet(kind, endpoint, response, columns)
+            return self._write_jsonl(kind, endpoint, response)
+
+    def _write_jsonl(self, kind, endpoint, response):
+        directory = self.directory(kind, endpoint)
+        path = self.segments.get((kind, endpoint))
+        if path is None or os.path.dirname(path) != directory \
+                or os.path.getsize(path) >= self.segment_bytes:
+            extension = {None: 'jsonl', 'gzip': 'jsonl.gz', 'zstd': 'jsonl.zst'}[self.compression]
+            path = self.segments[(kind, endpoint)] = os.path.join(
+                directory, self._segment_name(extension)
+            )
+
+        line = (json.dumps(response, separators=(',', ':')) + '\n').encode('utf-8')
+        if self.compression == 'gzip':
+            line = gzip.compress(line)
+        elif self.compression == 'zstd':
+            line = self._compressor.compress(line)
+        with open(path, 'ab') as file:
+            file.write(line)
+        return path
+
+    def _write_parquet(self, kind, endpoint, response, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        data = response['data']
+        batch = columns.from_records([data] if isinstance(data, dict) else data).to_arrow()
+        path = os.path.join(self.directory(kind, endpoint), self._segment_name('parquet'))
+        pq.write_table(
+            pa.Table.from_batches([batch]),
+            path,
+            compression=self.compression or 'none'
+        )
+        return path
+
+
+def read_pages(path: str):
+    """ Yields the response pages stored in a jsonl segment. """
+    if path.endswith('.gz'):
+        file = gzip.open(path, 'rt', encoding='utf-8')
+    elif path.endswith('.zst'):
+        import io
+        import zstandard
+        file = io.TextIOWrapper(
+            zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True),
+            encoding='utf-8'
+        )
+    else:
+        file = open(path, 'r', encoding='utf-8')
+    with file:
+        for line in file:
+            yield loads(line)
@@ -0,0 +1,88 @@
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from constants import DEFAULT_POOL_SIZE
+
+
+def create_http_session(
+    pool_size: int = DEFAULT_POOL_SIZE, 
+    keep_alive: bool = True, 
+    http2: bool = False
+):
+    """
+        Long lived client that keeps connections to api.twitter.com open
+        between requests. With http2=True an httpx client is used when httpx
+        and h2 are installed, otherwise it falls back to a pooled requests
+        Session.
+    """
+    if http2:
+        try:
+            import httpx
+            return httpx.Client(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size if keep_alive else 0
+                )
+            )
+        except ImportError:
+            pass
+
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def shares_pool(http) -> bool:
+    """ True if share_pool can hand the connection pool of http to a requests session. """
+    return isinstance(getattr(http, 'adapters', None), dict)
+
+
+def share_pool(session: Session, http) -> None:
+    """
+        Mounts the adapters of a requests based http client on session. An
+        httpx client (http2=True) has no adapters to share, the token
+        requests then go through the client itself, see TwitterAPI._refresh.
+    """
+    if shares_pool(http):
+        for prefix, adapter in http.adapters.items():
+            session.mount(prefix, adapter)
+
+
+def create_async_http_session(
+    pool_size: int = DEFAULT_POOL_SIZE, 
+    keep_alive: bool = True, 
+    http2: bool = False
+):
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError("AsyncTwitterAPI requires httpx: pip install httpx") from e
+
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size if keep_alive else 0
+    )
+    try:
+        return httpx.AsyncClient(http2=http2, limits=limits)
+    except ImportError:
+        return httpx.AsyncClient(limits=limits)
+
+
+def connection_errors():
+    """ Exceptions raised by the supported clients when a connection drops. """
+    from requests import ConnectionError, Timeout
+    errors = (ConnectionError, Timeout)
+    try:
+        import httpx
+        errors += (httpx.TransportError,)
+    except ImportError:
+        pass
+    return errors
+
+
+CONNECTION_ERRORS = connection_errors()
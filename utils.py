@@ -1,4 +1,33 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 def datetime_parser(dt: datetime):
     return dt.strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+def _epoch(moment) -> float:
+    if not isinstance(moment, datetime):
+        moment = datetime.fromisoformat(moment.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def until_created_at(moment):
+    """
+        stop_when for paginated calls: stops at the first result created
+        before moment (a datetime, UTC if naive, or an api timestamp). Meant
+        for newest first endpoints and needs created_at in the fields.
+    """
+    cutoff = _epoch(moment)
+    def stop(record: dict) -> bool:
+        created_at = record.get('created_at')
+        return created_at is not None and _epoch(created_at) < cutoff
+    return stop
+
+
+def until_seen_id(ids):
+    """ stop_when for paginated calls: stops at the first result whose id is in ids. """
+    ids = {ids} if isinstance(ids, str) else set(ids)
+    def stop(record: dict) -> bool:
+        return record.get('id') in ids
+    return stop